@@ -1,19 +1,54 @@
 import os
-import requests
 import re
 import json
+import asyncio
+import uuid
+import shutil
 from datetime import datetime, timedelta, timezone
 from collections import defaultdict
-from difflib import SequenceMatcher
 from pathlib import Path
 import tempfile
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+import httpx
+from fastapi import FastAPI, HTTPException, Request
 from pydantic import BaseModel
-from openai import OpenAI
-from fastapi.responses import FileResponse, JSONResponse
+from openai import AsyncOpenAI
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
 import uvicorn
+from jobs import JobManager, JobQueueFull
+from artifacts import ARTIFACT_FILES, ArtifactStore
+from streams import completed_stream, relay
+from singleflight import SingleFlight
+from segments import SegmentComposer
+from scheduler import ConfigStats, Warmer, parse_hours
+from cache import TTLCache, cache_key
+from pool import ArticlePool
+from store import ArticleStore
+from dedup import dedup_articles
+from keywords import KeywordMatcher
+from sources import SourceRegistry
+from newsapi import NewsAPI
+from governor import Governor, Lane, Overloaded
+import deadline
+from metrics import Registry, Timings
+from prompt import PromptEncoder, tokens_for_chars
+import tts
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app):
+    background = []
+    if article_pool is not None:
+        background.append(asyncio.create_task(article_pool.refresh_forever()))
+    if article_store is not None:
+        background.append(asyncio.create_task(article_store.refresh_forever()))
+    if warmer.hours:
+        background.append(asyncio.create_task(warmer.run_forever()))
+    yield
+    for task in background:
+        task.cancel()
+    await http_client.aclose()
+
+app = FastAPI(lifespan=lifespan)
 @app.get("/", include_in_schema = False)
 async def root_health():
     return {"status": "ok"}
@@ -21,10 +56,73 @@ async def root_health():
 # Load environment variables
 NEWSAPI_KEY = os.environ["NEWSAPI_KEY"]
 OPENAI_KEY = os.environ["OPENAI_KEY"]
-client = OpenAI(api_key=OPENAI_KEY)
+# Retries happen in the governor's lanes, which give up their slot while backing off
+client = AsyncOpenAI(api_key=OPENAI_KEY, max_retries=0)
+
+# Shared pooled HTTP client so NewsAPI calls never block the event loop
+http_client = httpx.AsyncClient(timeout=30, limits=httpx.Limits(max_connections=100, max_keepalive_connections=20))
+
+# Every upstream call goes through a lane of the governor, which caps calls in flight, paces them
+# (calls per second, 0: unpaced) and retries 429/5xx responses. New requests get a 503 while more
+# than UPSTREAM_MAX_WAITING calls are queued for any lane (0: no limit). Idempotent calls (NewsAPI
+# pages, summary, title) are hedged after their p95 latency unless HEDGE_REQUESTS=0.
+upstream_max_waiting = int(os.getenv("UPSTREAM_MAX_WAITING", "200"))
+hedging = os.getenv("HEDGE_REQUESTS", "1") != "0"
+governor = Governor(
+    Lane(
+        "newsapi",
+        concurrency=int(os.getenv("NEWSAPI_CONCURRENCY", "6")),
+        rate=float(os.getenv("NEWSAPI_RATE", "5")),
+        burst=10,
+        max_waiting=upstream_max_waiting,
+        retries=int(os.getenv("NEWSAPI_RETRIES", "3")),
+        hedging=hedging,
+    ),
+    Lane(
+        "llm",
+        concurrency=int(os.getenv("LLM_CONCURRENCY", "16")),
+        rate=float(os.getenv("LLM_RATE", "0")),
+        max_waiting=upstream_max_waiting,
+        retries=int(os.getenv("LLM_RETRIES", "3")),
+        hedging=hedging,
+    ),
+    Lane(
+        "tts",
+        concurrency=int(os.getenv("TTS_MAX_IN_FLIGHT", "16")),
+        rate=float(os.getenv("TTS_RATE", "0")),
+        max_waiting=upstream_max_waiting,
+        retries=int(os.getenv("TTS_RETRIES", "3")),
+    ),
+)
+
+# Sources are fetched in groups of NEWSAPI_GROUP_SIZE, up to NEWSAPI_MAX_PAGES pages each,
+# each page waiting at most NEWSAPI_TIMEOUT seconds
+newsapi = NewsAPI(
+    http_client,
+    NEWSAPI_KEY,
+    base_url=os.getenv("NEWSAPI_URL", "https://newsapi.org/v2"),
+    group_size=int(os.getenv("NEWSAPI_GROUP_SIZE", "5")),
+    max_pages=int(os.getenv("NEWSAPI_MAX_PAGES", "3")),
+    lane=governor["newsapi"],
+    timeout=float(os.getenv("NEWSAPI_TIMEOUT", "30")),
+)
 
 tmp = Path(tempfile.gettempdir())
 
+# Every generation writes into its own directory, addressed by job id
+artifact_store = ArtifactStore(
+    Path(os.getenv("ARTIFACT_DIR", tmp / "dailycast_artifacts")),
+    max_bytes=int(os.getenv("ARTIFACT_MAX_MB", "2048")) * 1024 * 1024,
+    max_age=int(os.getenv("ARTIFACT_MAX_AGE_HOURS", "24")) * 3600,
+)
+latest_job_id = None
+
+# Background job mode: bounded number of pipelines running at once
+job_manager = JobManager(
+    max_concurrent=int(os.getenv("MAX_CONCURRENT_JOBS", "4")),
+    max_queued=int(os.getenv("MAX_QUEUED_JOBS", "100")),
+)
+
 # Define input model
 class PodcastInput(BaseModel):
     chosen_categories: list[str] = ["General", "Sports"]
@@ -35,6 +133,7 @@ class PodcastInput(BaseModel):
     chosen_timeframe: int = 2
     chosen_speed: str = "Normal"
     chosen_voice: str = "male1"
+    chosen_mode: str = "full"  # "segments" assembles the episode from cached shared segments
 
 # Source mappings and configurations
 categories = {
@@ -102,37 +201,234 @@ source_map_input = {
     "MSNBC": "msnbc",
 }
 
+# Built once; requests overlay their own General/Politics sources without touching it
+source_registry = SourceRegistry(categories, source_display_names, source_map_input)
+
 voice_map = {"male1": "ballad", "male2": "echo", "female1": "fable", "female2": "shimmer"}
 speed_map = {"Slow": 0.75, "Normal": 1.0, "Fast": 1.25, "Very Fast": 1.5}
 wpm_map = {"Slow": 134, "Normal": 178, "Fast": 223, "Very Fast": 267}
 
-def fetch_articles(chosen_sources, chosen_keywords, start_date, end_date):
-    query_sources = ",".join(chosen_sources)
-    query_keywords = " OR ".join(chosen_keywords)
-    params = {
-        "apiKey": NEWSAPI_KEY,
-        "sources": query_sources,
-        "qInTitle": query_keywords,
-        "from": start_date,
-        "to": end_date,
-        "pageSize": 100,
-        "sortBy": "popularity",
-        "language": "en",
-    }
-    response = requests.get("https://newsapi.org/v2/everything", params = params, timeout = 30)
-    return response.json()
+# NewsAPI responses are reused for NEWS_CACHE_TTL seconds (optionally persisted to NEWS_CACHE_DIR)
+news_cache = TTLCache(
+    maxsize=int(os.getenv("NEWS_CACHE_SIZE", "256")),
+    ttl=int(os.getenv("NEWS_CACHE_TTL", "900")),
+    disk_dir=os.getenv("NEWS_CACHE_DIR") or None,
+)
+
+# NEWS_BACKEND=pool fetches each source window once and filters keywords locally (a window holds
+# a source's NEWSAPI_MAX_PAGES most popular pages; keywords none of those match are queried directly);
+# NEWS_BACKEND=store keeps articles in a SQLite file (ARTICLE_DB) and only fetches what is new
+news_backend = os.getenv("NEWS_BACKEND", "direct")
+article_pool = None
+article_store = None
+if news_backend == "pool":
+    article_pool = ArticlePool(
+        lambda *window: fetch_source_window(*window),  # defined below
+        refresh_interval=int(os.getenv("POOL_REFRESH_INTERVAL", "600")),
+        idle_ttl=int(os.getenv("POOL_IDLE_TTL", "3600")),
+    )
+elif news_backend == "store":
+    article_store = ArticleStore(
+        os.getenv("ARTICLE_DB", str(tmp / "dailycast_articles.sqlite3")),
+        lambda *window: fetch_source_range(*window),  # defined below
+        refresh_interval=int(os.getenv("STORE_REFRESH_INTERVAL", "600")),
+        idle_ttl=int(os.getenv("STORE_IDLE_TTL", "3600")),
+        retention_days=int(os.getenv("STORE_RETENTION_DAYS", "45")),
+    )
+
+# Generated script, summary and title by article-set fingerprint; the audio for each
+# fingerprint and voice lives in the artifact store and shares its eviction
+result_cache = TTLCache(
+    maxsize=int(os.getenv("RESULT_CACHE_SIZE", "512")),
+    ttl=int(os.getenv("RESULT_CACHE_TTL", "86400")),
+    disk_dir=os.getenv("RESULT_CACHE_DIR") or None,
+)
+
+# Coalesces identical in-flight work: whole requests, fetches, script, summary, title and audio
+flights = SingleFlight()
+
+async def synthesize_segment(text, voice, speed):
+    # Like episode audio, segment audio is not cut short by the episode deadline once its script exists
+    with deadline.lifted():
+        return await tts.synthesize(
+            client, text, voice, speed, governor["tts"], max_chars=tts_chunk_chars, concurrency=tts_concurrency
+        )
+
+# Segment composition mode: segment scripts share result_cache, segment audio the artifact store
+composer = SegmentComposer(
+    client,
+    result_cache,
+    artifact_store,
+    flights,
+    synthesize_segment,
+    words_per_article=int(os.getenv("SEGMENT_WORDS_PER_ARTICLE", "80")),
+    max_segment_words=int(os.getenv("SEGMENT_MAX_WORDS", "400")),
+    lane=governor["llm"],
+)
+
+# Cache warming: the WARM_TOP_N most requested configurations are pre-built once a day
+# during WARM_HOURS (UTC, e.g. "4-6"); request counts persist to WARM_STATS_PATH if set
+warm_top_n = int(os.getenv("WARM_TOP_N", "20"))
+config_stats = ConfigStats(os.getenv("WARM_STATS_PATH") or None, max_configs=5 * warm_top_n)
+warmer = Warmer(
+    config_stats,
+    lambda config: warm_config(config),  # defined below
+    parse_hours(os.getenv("WARM_HOURS", "")),
+    top_n=warm_top_n,
+    concurrency=int(os.getenv("WARM_CONCURRENCY", "1")),
+)
+
+# Deadline budgets (seconds, 0: none): EPISODE_DEADLINE for an episode requested on
+# /generate_podcast, FETCH_BUDGET for fetching its articles. Past the deadline summary and title
+# are skipped instead of failing the episode, and fetch groups that did not make it are left out.
+# Audio is bounded by AUDIO_TIMEOUT alone, and /jobs, batch and warm runs have no episode deadline.
+episode_deadline = float(os.getenv("EPISODE_DEADLINE", "300"))
+fetch_budget = float(os.getenv("FETCH_BUDGET", "20"))
+
+# Per-stage timeouts (seconds) for the stages that run after the script, within the deadline
+summary_timeout = float(os.getenv("SUMMARY_TIMEOUT", "60"))
+title_timeout = float(os.getenv("TITLE_TIMEOUT", "60"))
+audio_timeout = float(os.getenv("AUDIO_TIMEOUT", "600"))
+
+# Chunked TTS: chunk size in characters, parallel chunks per episode (TTS_MAX_IN_FLIGHT caps all episodes)
+tts_chunk_chars = int(os.getenv("TTS_CHUNK_CHARS", "1500"))
+tts_concurrency = int(os.getenv("TTS_CONCURRENCY", "4"))
+
+# Script prompt: a compact digest sized to PROMPT_TOKENS_PER_WORD tokens per word of script
+# (at least PROMPT_MIN_TOKENS), descriptions clipped to PROMPT_DESCRIPTION_CHARS
+prompt_encoder = PromptEncoder(
+    tokens_per_word=float(os.getenv("PROMPT_TOKENS_PER_WORD", "6")),
+    min_tokens=int(os.getenv("PROMPT_MIN_TOKENS", "2000")),
+    description_chars=int(os.getenv("PROMPT_DESCRIPTION_CHARS", "300")),
+)
+
+# Prometheus metrics served on /metrics; every episode also reports its own timings
+metrics = Registry()
+stage_seconds = metrics.histogram(
+    "dailycast_stage_seconds", "Time spent in each pipeline stage", labels=("stage", "outcome")
+)
+llm_tokens_total = metrics.counter(
+    "dailycast_llm_tokens_total", "Tokens reported by the Responses API", labels=("stage", "kind")
+)
+articles_total = metrics.counter(
+    "dailycast_articles_total", "Articles fetched (raw) and kept after deduplication (final)", labels=("kind",)
+)
+artifact_bytes_total = metrics.counter(
+    "dailycast_artifact_bytes_total", "Bytes written per artifact type", labels=("artifact",)
+)
+prompt_tokens_saved_total = metrics.counter(
+    "dailycast_prompt_tokens_saved_total", "Estimated script prompt tokens saved over the indented JSON prompt"
+)
+episodes_total = metrics.counter(
+    "dailycast_episodes_total", "Episodes generated, partial when a stage after the script failed", labels=("mode", "outcome")
+)
+cancelled_total = metrics.counter(
+    "dailycast_cancelled_total", "Requests abandoned before their episode was done", labels=("reason",)
+)
 
-def normalize_title(t: str):
-    return " ".join((t or "").lower().split())
+def runtime_gauges():
+    gauges = [
+        ("dailycast_jobs_pending", "Jobs queued or running", {}, job_manager.pending()),
+        ("dailycast_flights_in_flight", "Coalesced tasks currently running", {}, len(flights.flights)),
+        ("dailycast_newsapi_requests", "NewsAPI requests made since startup", {}, newsapi.requests),
+    ]
+    for name, cache in (("news", news_cache), ("result", result_cache)):
+        cache_stats = cache.stats()
+        for field in ("size", "hits", "misses"):
+            gauges.append((f"dailycast_cache_{field}", f"Cache {field}", {"cache": name}, cache_stats[field]))
+    if article_pool is not None:
+        pool_stats = article_pool.stats()
+        gauges.append(("dailycast_pool_articles", "Articles held in the article pool", {}, pool_stats["articles"]))
+    if article_store is not None:
+        gauges.append(("dailycast_store_upstream_calls", "NewsAPI fetches made by the article store", {}, article_store.upstream_calls))
+    for lane, lane_stats in governor.stats().items():
+        for field in ("in_flight", "waiting", "retried", "rejected", "hedged", "hedge_wins"):
+            gauges.append((f"dailycast_upstream_{field}", f"Upstream calls {field.replace('_', ' ')}", {"lane": lane}, lane_stats[field]))
+    return gauges
+
+metrics.collectors.append(runtime_gauges)
+
+def record_bytes(artifact, size, timings):
+    artifact_bytes_total.inc(size, artifact=artifact)
+    timings.count(f"{artifact}_bytes", size)
+
+def news_cache_key(chosen_sources, chosen_keywords, start_date, end_date, sort_by="popularity", language="en"):
+    # Source and keyword order (and keyword case) do not change NewsAPI results
+    return cache_key(
+        sorted(set(chosen_sources)),
+        sorted({kw.strip().lower() for kw in chosen_keywords}),
+        start_date,
+        end_date,
+        language,
+        sort_by,
+    )
+
+async def fetch_articles(chosen_sources, chosen_keywords, start_date, end_date, ttl=None):
+    key = news_cache_key(chosen_sources, chosen_keywords, start_date, end_date)
+    cached = await asyncio.to_thread(news_cache.get, key)
+    if cached is not None:
+        return cached
+    # Identical queries already on their way to NewsAPI share that call. It runs without the
+    # first caller's deadline, so it never loses groups to it; each caller bounds its own wait
+    with deadline.lifted():
+        flight = flights.join(("fetch", key), lambda flight: fetch_and_cache(key, chosen_sources, chosen_keywords, start_date, end_date, ttl))
+    return await asyncio.wait_for(flights.wait(flight), deadline.clamp(None))
 
-def fuzzy_dedup(articles, threshold = 0.9):
-    kept = []
-    for art in articles:
-        t = normalize_title(art["title"])
-        if any(SequenceMatcher(None, t, normalize_title(k["title"])).ratio() >= threshold for k in kept):
-            continue
-        kept.append(art)
-    return kept
+async def fetch_and_cache(key, chosen_sources, chosen_keywords, start_date, end_date, ttl=None):
+    payload = await newsapi.everything(chosen_sources, chosen_keywords, start_date, end_date)
+    if not payload.get("failedGroups"):
+        # A payload missing some groups is used once, not cached; the next request tries them again
+        await asyncio.to_thread(news_cache.set, key, payload, ttl)
+    return payload
+
+async def fetch_source_window(source_id, start_date, end_date):
+    # One source, no keyword filter: the shared pool filters locally per request
+    params = {"sources": source_id, "from": start_date, "to": end_date, "sortBy": "popularity", "language": "en"}
+    # The window is shared by every request that wants it, so the first one's deadline must not cut it short
+    with deadline.lifted():
+        articles, _ = await newsapi.fetch_all(params)
+    return articles
+
+async def fetch_source_range(source_id, since, until):
+    # Newest first, so a page cap drops the oldest articles, which the store then fetches below the rest
+    params = {"sources": source_id, "from": since.rstrip("Z"), "to": until.rstrip("Z"), "sortBy": "publishedAt", "language": "en"}
+    return await newsapi.fetch_all(params)
+
+def filter_by_keywords(articles, chosen_keywords):
+    # Local equivalent of the qInTitle OR-query
+    if not chosen_keywords:
+        return articles
+    matcher = KeywordMatcher(chosen_keywords)
+    return [a for a in articles if matcher.search(a.get("title") or "")]
+
+def match_keywords(articles, chosen_keywords):
+    # filter_by_keywords, plus the keywords that no article matched
+    if not chosen_keywords:
+        return articles, []
+    matcher = KeywordMatcher(chosen_keywords)
+    kept, matched = [], set()
+    for a in articles:
+        found = matcher.matches(a.get("title") or "")
+        if found:
+            kept.append(a)
+            matched.update(found)
+    return kept, [kw for kw in matcher.keywords if kw not in matched]
+
+async def fetch_pooled(chosen_sources, chosen_keywords, start_date, end_date, ttl=None):
+    # Each request only gives up its own wait when its budget runs out
+    pooled = await asyncio.wait_for(article_pool.get(chosen_sources, start_date, end_date), deadline.clamp(None))
+    articles, unmatched = await asyncio.to_thread(match_keywords, pooled, chosen_keywords)
+    if not unmatched:
+        return articles
+    # A pool window only holds a source's NEWSAPI_MAX_PAGES most popular pages, so a keyword none of
+    # them mention may still have stories further down: those keywords get their own qInTitle query
+    try:
+        payload = await fetch_articles(chosen_sources, unmatched, start_date, end_date, ttl)
+    except Exception as e:
+        print("Keyword fallback fetch failed:", repr(e))
+        return articles
+    seen = {a.get("url") for a in articles if a.get("url")}
+    return articles + [a for a in payload.get("articles", []) if not a.get("url") or a.get("url") not in seen]
 
 def clean_field(s: str) -> str:
     if s is None:
@@ -147,64 +443,37 @@ def to_date(s):
     except Exception:
         return datetime.min
 
-@app.post("/generate_podcast")
-async def generate_podcast(podcast_input: PodcastInput):
-    # Process inputs
-    chosen_categories = podcast_input.chosen_categories
-    chosen_keywords = podcast_input.chosen_keywords
-    chosen_general_sources = podcast_input.chosen_general_sources
-    chosen_political_sources = podcast_input.chosen_political_sources
-    chosen_length = podcast_input.chosen_length
-    chosen_timeframe = podcast_input.chosen_timeframe
-    chosen_speed = podcast_input.chosen_speed
-    chosen_voice = podcast_input.chosen_voice
+def write_text(path, text):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+        return f.tell()
 
-    # Set up categories
-    categories["General"] = [
-        source_map_input.get(src, src.lower().replace(' ', '-')) for src in chosen_general_sources
-    ]
-    categories["Politics"] = [
-        source_map_input.get(src, src.lower().replace(' ', '-')) for src in chosen_political_sources
-    ]
+def write_json(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+        return f.tell()
 
-    # Calculate word count bounds
-    chosen_total_words = chosen_length * wpm_map[chosen_speed]
-    low_bound_words = int(chosen_total_words * 0.99)
-    high_bound_words = int(chosen_total_words * 1.01)
+def process_articles(raw_articles, selection, chosen_categories, chosen_keywords, timings):
+    with timings.span("reformat"):
+        reformatted = reformat_articles(raw_articles, selection)
 
-    # Set up timeframe (adjusted to past)
-    today = datetime.now(timezone.utc)
-    start_dt = today - timedelta(days=chosen_timeframe + 7)
-    start_date = start_dt.strftime('%Y-%m-%d')
-    end_date = (today - timedelta(days=7)).strftime('%Y-%m-%d')
+    # Deduplicate articles
+    with timings.span("dedup"):
+        final_articles = dedup_articles(reformatted, threshold=0.9)
+    timings.count("final_articles", len(final_articles))
+    articles_total.inc(len(final_articles), kind="final")
 
-    # Get chosen sources
-    chosen_sources = []
-    for category in chosen_categories:
-        chosen_sources.extend(categories[category])
-    chosen_sources = list(dict.fromkeys(chosen_sources))
-    display_sources = [source_display_names.get(src_id, src_id) for src_id in chosen_sources]
-
-    # Map sources to categories
-    source_to_category = {}
-    for category, sources in categories.items():
-        for s in sources:
-            source_to_category[s] = category
-            display_name = source_display_names.get(s, s)
-            source_to_category[display_name] = category
-
-    # Fetch and process articles
-    raw_payload = fetch_articles(chosen_sources, chosen_keywords, start_date, end_date)
-    raw_articles = raw_payload.get("articles", [])
-    print("Raw articles count:", len(raw_articles))
+    with timings.span("grouping"):
+        ordered_grouped = group_articles(final_articles, chosen_categories, chosen_keywords)
+    return final_articles, ordered_grouped
 
+def reformat_articles(raw_articles, selection):
     reformatted = []
     for a in raw_articles:
         src = a.get("source", {})
         src_name = src.get("name")
         src_id = src.get("id")
-        primary_category = source_to_category.get(src_id, source_to_category.get(src_name, "Unknown"))
-        print(f"Article: {a.get('title', 'No title')}, Source ID: {src_id}, Source Name: {src_name}, Category: {primary_category}")
+        primary_category = selection.category_for(src_id, src_name)
         published_raw = a.get("publishedAt") or ""
         published_date = published_raw.split("T")[0] if "T" in published_raw else published_raw
 
@@ -218,32 +487,23 @@ async def generate_podcast(podcast_input: PodcastInput):
             "image": a.get("urlToImage"),
             "publishedAt": published_date,
         })
+    return reformatted
 
-    # Deduplicate articles
-    seen = set()
-    exact_dedup = [art for art in reformatted if not (normalize_title(art["title"]) in seen or seen.add(normalize_title(art["title"])))]
-    final_articles = fuzzy_dedup(exact_dedup, threshold=0.9)
-    print("Final articles count:", len(final_articles))
-
+def group_articles(final_articles, chosen_categories, chosen_keywords):
     # Group and sort articles
-    keyword_patterns = {kw: re.compile(r'\b' + re.escape(kw) + r'\b', re.IGNORECASE) for kw in chosen_keywords}
+    matcher = KeywordMatcher(chosen_keywords)
     grouped = defaultdict(lambda: defaultdict(list))
 
     for art in final_articles:
         cat = art.get("primary_category", "Unknown")
-        title_lc = (art.get("title") or "").lower()
-        matched_any = False
-        for kw, pat in keyword_patterns.items():
-            if pat.search(title_lc):
-                grouped[cat][kw].append(art)
-                matched_any = True
+        matched = matcher.matches(art.get("title") or "")
+        for kw in matched:
+            grouped[cat][kw].append(art)
         if not chosen_keywords:
             grouped[cat]["__NO_KEYWORDS__"].append(art)
-        elif not matched_any:
+        elif not matched:
             grouped[cat]["__UNMATCHED__"].append(art)
 
-    print("Grouped articles:", dict(grouped))
-
     for kwdict in grouped.values():
         for arts in kwdict.values():
             arts.sort(key=lambda a: to_date(a.get("publishedAt", "")), reverse=False)
@@ -261,7 +521,305 @@ async def generate_podcast(podcast_input: PodcastInput):
         if cat in grouped:
             kwdict = grouped[cat]
             ordered_grouped[cat] = {kw: kwdict[kw] for kw in sorted(kwdict.keys(), key=keyword_order_key)}
-    print("Ordered grouped articles:", ordered_grouped)
+    return ordered_grouped
+
+def encode_prompt(ordered_grouped, json_size, start_date, end_date, total_words):
+    # The compact digest plus how many tokens it saves over the indented JSON it replaces,
+    # estimated from the size of that JSON as written to the episode's json artifact
+    text, stats = prompt_encoder.encode(ordered_grouped, start_date, end_date, total_words)
+    stats["json_tokens"] = tokens_for_chars(json_size)
+    stats["saved_tokens"] = stats["json_tokens"] - stats["tokens"]
+    return text, stats
+
+def report(job, stage):
+    if job is not None:
+        job.set_stage(stage)
+
+def record_usage(stage, response, timings=None):
+    # Token counts from a Responses API result, if the API reported them
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return
+    for kind in ("input_tokens", "output_tokens"):
+        tokens = getattr(usage, kind, None) or 0
+        llm_tokens_total.inc(tokens, stage=stage, kind=kind)
+        if timings is not None:
+            timings.count(f"{stage}_{kind}", tokens)
+
+async def run_stage(job, errors, name, coro, timeout, timings):
+    # A failing or slow stage is recorded in errors instead of failing the episode
+    timeout = deadline.clamp(timeout)
+    if timeout == 0:
+        coro.close()
+        print(f"Stage {name} skipped: deadline reached")
+        errors[name] = "Skipped, the request deadline was reached"
+        if job is not None:
+            job.mark(name, "skipped")
+        return None
+    if job is not None:
+        job.mark(name, "running")
+    try:
+        with timings.span(name):
+            result = await asyncio.wait_for(coro, timeout)
+    except Exception as e:
+        if isinstance(e, asyncio.TimeoutError):
+            message = f"Timed out after {timeout:.1f}s"
+        else:
+            message = str(e) or e.__class__.__name__
+        print(f"Stage {name} failed: {message}")
+        errors[name] = message
+        if job is not None:
+            job.mark(name, "failed")
+        return None
+    if job is not None:
+        job.mark(name, "done")
+    return result
+
+async def generate_script(system_prompt, user_prompt, stream, timings=None):
+    # Streams text deltas to stream as the model emits them and returns the full script
+    deltas = []
+    try:
+        # The LLM slot is held until the stream ends
+        async with governor["llm"].hold(lambda: client.responses.create(
+            model="gpt-4o-mini",
+            instructions=system_prompt,
+            input=user_prompt,
+            stream=True
+        )) as response:
+            async for event in response:
+                if event.type == "response.output_text.delta":
+                    deltas.append(event.delta)
+                    stream.publish(event.delta)
+                elif event.type == "response.completed":
+                    record_usage("script", event.response, timings)
+                elif event.type in ("response.failed", "error"):
+                    raise RuntimeError(f"Script generation failed: {event.type}")
+    except BaseException as e:
+        stream.close(e if isinstance(e, Exception) else RuntimeError("Script generation was cancelled"))
+        raise
+    stream.close()
+    return "".join(deltas)
+
+async def generate_summary(script, timings=None):
+    summary_response = await governor["llm"].run(lambda: client.responses.create(
+        model="gpt-4o-mini",
+        instructions="Summarize the input in a few sentences very clearly.",
+        input=script
+    ), hedge="summary")
+    record_usage("summary", summary_response, timings)
+    return summary_response.output_text
+
+async def generate_title(script, timings=None):
+    title_response = await governor["llm"].run(lambda: client.responses.create(
+        model="gpt-4o-mini",
+        instructions="Create a concise, compelling podcast episode title (max 30 characters) based on the following script. No quotation marks; return only the title.",
+        input=script
+    ), hedge="title")
+    record_usage("title", title_response, timings)
+    return title_response.output_text.strip()
+
+def append_bytes(path, data):
+    with open(path, "ab") as f:
+        f.write(data)
+
+async def synthesize_audio(paragraphs, chosen_voice, chosen_speed, audio_path, stream=None):
+    # Parts are persisted and published to live listeners in order as they finish
+    partial_path = audio_path.with_name(audio_path.name + ".part")
+    await asyncio.to_thread(partial_path.write_bytes, b"")
+
+    async def on_part(part):
+        await asyncio.to_thread(append_bytes, partial_path, part)
+        if stream is not None:
+            stream.publish(part)
+
+    try:
+        await tts.synthesize_stream(
+            client,
+            paragraphs,
+            voice=voice_map[chosen_voice],
+            speed=speed_map[chosen_speed],
+            lane=governor["tts"],
+            max_chars=tts_chunk_chars,
+            concurrency=tts_concurrency,
+            on_part=on_part,
+        )
+    except BaseException as e:
+        if stream is not None:
+            stream.close(e if isinstance(e, Exception) else RuntimeError("Audio synthesis was cancelled"))
+        raise
+    await asyncio.to_thread(partial_path.replace, audio_path)
+    if stream is not None:
+        stream.close()
+    return audio_path
+
+def resolve_window(chosen_timeframe):
+    # Date window (adjusted to past) for a timeframe in days
+    today = datetime.now(timezone.utc)
+    start_dt = today - timedelta(days=chosen_timeframe + 7)
+    start_date = start_dt.strftime('%Y-%m-%d')
+    end_date = (today - timedelta(days=7)).strftime('%Y-%m-%d')
+    return today, start_date, end_date
+
+def request_key(podcast_input):
+    _, start_date, end_date = resolve_window(podcast_input.chosen_timeframe)
+    return cache_key("episode", podcast_input.model_dump(), start_date, end_date)
+
+async def compose_episode(ordered_grouped, start_date, end_date, chosen_total_words, chosen_voice, chosen_speed, job_id, job=None):
+    script, audio, _ = await composer.compose(
+        ordered_grouped, start_date, end_date, chosen_total_words, voice_map[chosen_voice], speed_map[chosen_speed]
+    )
+    script_path = artifact_store.path(job_id, "script")
+    audio_path = artifact_store.path(job_id, "audio")
+    await asyncio.to_thread(write_text, script_path, script)
+    await asyncio.to_thread(audio_path.write_bytes, audio)
+    if job is not None:
+        job.script_stream.publish(script)
+        job.script_stream.close()
+        job.audio_stream.publish(audio)
+        job.audio_stream.close()
+    return script, audio_path
+
+async def cached_or_run(value, fn):
+    return value if value is not None else await fn()
+
+async def already(value):
+    return value
+
+async def generate_and_cache_script(script_key, system_prompt, user_prompt, stream, timings=None):
+    script = await generate_script(system_prompt, user_prompt, stream, timings)
+    await asyncio.to_thread(result_cache.set, script_key, {"script": script})
+    return script
+
+def cache_audio(audio_key, produced_path):
+    artifact_store.create(audio_key)
+    try:
+        link_or_copy(produced_path, artifact_store.path(audio_key, "audio"))
+    finally:
+        artifact_store.release(audio_key)
+
+def audio_key_for(script, chosen_voice, chosen_speed):
+    # Audio is keyed by the text it voices, so it can never be served next to a different script
+    return "audio-" + cache_key(script, chosen_voice, chosen_speed)
+
+async def produce_audio(script_flight, script, script_source, chosen_voice, chosen_speed, audio_path, stream):
+    # A cached script may already have its audio in the artifact store. A script still being
+    # written (script_flight) is always voiced afresh and stored once its final text is known.
+    if script_flight is None:
+        cached_path = artifact_store.find(audio_key_for(script, chosen_voice, chosen_speed), "audio")
+        if cached_path is not None:
+            stream.publish(await asyncio.to_thread(cached_path.read_bytes))
+            stream.close()
+            return cached_path
+    produced_path = await synthesize_audio(
+        tts.split_paragraphs(script_source.subscribe()), chosen_voice, chosen_speed, audio_path, stream
+    )
+    if script_flight is not None:
+        # The stream has ended, so the script is done; shielded so this is not one of its waiters
+        script = await asyncio.shield(script_flight.task)
+    await asyncio.to_thread(cache_audio, audio_key_for(script, chosen_voice, chosen_speed), produced_path)
+    return produced_path
+
+def link_or_copy(src, dst):
+    if os.path.exists(dst):
+        os.unlink(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+async def receive_audio(audio_flight, audio_path, job=None):
+    # Follows a possibly shared audio flight and makes sure this job ends up with its own copy
+    relay_task = None
+    if job is not None:
+        relay_task = asyncio.create_task(relay(audio_flight.stream, job.audio_stream))
+    produced_path = await flights.wait(audio_flight)
+    if produced_path != audio_path:
+        await asyncio.to_thread(link_or_copy, produced_path, audio_path)
+    if relay_task is not None:
+        await relay_task
+    return audio_path
+
+async def warm_config(config):
+    # Same path as a user request, so the fetch, script and audio caches fill up
+    podcast_input = PodcastInput(**config)
+    return await flights.do(request_key(podcast_input), lambda: run_pipeline(podcast_input, warm=True))
+
+def record_demand(podcast_input):
+    # Request counts only feed the warmer, so none are kept while warming is off
+    if warmer.hours:
+        config_stats.record(podcast_input.model_dump())
+
+def seconds_until_tomorrow(now):
+    # Request windows, and so the keys of their fetches, change at midnight UTC
+    tomorrow = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return (tomorrow - now).total_seconds()
+
+async def run_pipeline(podcast_input, job=None, budget=None, warm=False):
+    global latest_job_id
+    job_id = job.id if job is not None else uuid.uuid4().hex
+    await asyncio.to_thread(artifact_store.evict)
+    await asyncio.to_thread(artifact_store.create, job_id)
+    try:
+        # Every stage and upstream call of the episode, and the tasks it starts, share this deadline
+        with deadline.budget(budget):
+            result = await generate_episode(podcast_input, job_id, job, warm)
+    except asyncio.CancelledError:
+        # Nobody wants this episode any more; its in-flight calls were cancelled along with it
+        episodes_total.inc(mode=podcast_input.chosen_mode, outcome="cancelled")
+        raise
+    finally:
+        artifact_store.release(job_id)
+    if not warm:
+        # Warm runs are nobody's episode, so /download/{file_type} keeps serving the last requested one
+        latest_job_id = job_id
+    return result
+
+async def generate_episode(podcast_input, job_id, job=None, warm=False):
+    timings = Timings(stage_seconds)
+    # Process inputs
+    chosen_categories = podcast_input.chosen_categories
+    chosen_keywords = podcast_input.chosen_keywords
+    chosen_general_sources = podcast_input.chosen_general_sources
+    chosen_political_sources = podcast_input.chosen_political_sources
+    chosen_length = podcast_input.chosen_length
+    chosen_timeframe = podcast_input.chosen_timeframe
+    chosen_speed = podcast_input.chosen_speed
+    chosen_voice = podcast_input.chosen_voice
+
+    # The user's General and Politics sources on top of the shared registry
+    selection = source_registry.select({"General": chosen_general_sources, "Politics": chosen_political_sources})
+
+    # Calculate word count bounds
+    chosen_total_words = chosen_length * wpm_map[chosen_speed]
+    low_bound_words = int(chosen_total_words * 0.99)
+    high_bound_words = int(chosen_total_words * 1.01)
+
+    # Set up timeframe (adjusted to past)
+    today, start_date, end_date = resolve_window(chosen_timeframe)
+    # Warmed fetches have to last until the day's peak, not just NEWS_CACHE_TTL
+    news_ttl = seconds_until_tomorrow(today) if warm else None
+
+    # Get chosen sources
+    chosen_sources = selection.sources_for(chosen_categories)
+    display_sources = [source_registry.display_name(src_id) for src_id in chosen_sources]
+
+    # Fetch and process articles (CPU-bound work runs off the event loop)
+    report(job, "fetching")
+    with timings.span("fetch"), deadline.budget(fetch_budget):
+        if article_pool is not None:
+            raw_payload = {"status": "ok", "articles": await fetch_pooled(chosen_sources, chosen_keywords, start_date, end_date, news_ttl)}
+        elif article_store is not None:
+            stored = await article_store.get(chosen_sources, start_date, end_date)
+            raw_payload = {"status": "ok", "articles": await asyncio.to_thread(filter_by_keywords, stored, chosen_keywords)}
+        else:
+            raw_payload = await fetch_articles(chosen_sources, chosen_keywords, start_date, end_date, news_ttl)
+    raw_articles = raw_payload.get("articles", [])
+    timings.count("raw_articles", len(raw_articles))
+    articles_total.inc(len(raw_articles), kind="raw")
+    report(job, "processing")
+    final_articles, ordered_grouped = await asyncio.to_thread(
+        process_articles, raw_articles, selection, chosen_categories, chosen_keywords, timings
+    )
 
     # Create output JSON
     output = {
@@ -285,22 +843,21 @@ async def generate_podcast(podcast_input: PodcastInput):
         }
     }
 
-    print("Output before saving:", output)
     # Save JSON output
-    output_path = tmp / "podsmith_output.json"
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(output, f, indent=2, ensure_ascii=False)
-    print("Output after saving:", output)
+    output_path = artifact_store.path(job_id, "json")
+    with timings.span("json_write"):
+        json_size = await asyncio.to_thread(write_json, output_path, output)
+        record_bytes("json", json_size, timings)
 
     # Generate podcast script
     system_prompt = f"""
-    You are an award-winning podcast writer. Using only the structured JSON news data (with each top-level key representing a category and its articles in chronological order), produce one seamless, conversational podcast script in natural paragraphs. Follow these rules absolutely:
+    You are an award-winning podcast writer. Using only the news digest provided (grouped by category, then by topic, with articles in chronological order), produce one seamless, conversational podcast script in natural paragraphs. Follow these rules absolutely:
     You must write **between {low_bound_words} and {high_bound_words} words** (95%–105% of {chosen_total_words}).  
     1. Draft your script normally.  
     2. If the count is outside the bounds, automatically trim or expand to hit the target, then output the final script.
-    • Use all fields from the JSON (titles, summaries, sources, publication dates, etc.) without inventing any new events or quotes. Reasonable, widely known context or inferences are allowed.  
+    • Use all fields from the digest (titles, descriptions, sources, publication dates) without inventing any new events or quotes. Reasonable, widely known context or inferences are allowed.  
     • Do not use headings, lists, bullet points, links, or any markdown.  
-    • Create one flowing segment per category, in the JSON’s given order. Within each, cover its articles in the order they appear.  
+    • Create one flowing segment per category, in the digest’s given order. Within each, cover its articles in the order they appear.  
     • Open with a concise, attention-grabbing hook that previews the episode’s top stories and time frame.  
     • Employ smooth, conversational transitions between segments (e.g., “Now, let’s turn to our next story…”).  
     • End with a brief sign-off and a teaser for tomorrow’s episode.  
@@ -308,74 +865,271 @@ async def generate_podcast(podcast_input: PodcastInput):
     Output only the raw script text.
     """
 
-    user_prompt = json.dumps(output, indent=2)
-    response = client.responses.create(
-        model="gpt-4o-mini",
-        instructions=system_prompt,
-        input=user_prompt
+    report(job, "script")
+    errors = {}
+
+    # Without articles there is nothing to build segments from, so such an episode is written in full
+    segmented = podcast_input.chosen_mode == "segments" and bool(
+        composer.plan(ordered_grouped, start_date, end_date, chosen_total_words)
     )
-    script = response.output_text
+    if segmented:
+        # Episode assembled from shared per-(category, keyword) segments plus new intro/transitions/outro
+        with timings.span("compose"):
+            script, audio_path = await compose_episode(
+                ordered_grouped, start_date, end_date, chosen_total_words, chosen_voice, chosen_speed, job_id, job
+            )
+        script_key = cache_key("composed", script)
+        cached = await asyncio.to_thread(result_cache.get, script_key) or {}
+        # The audio is already in place; awaited below just like full mode's audio stage
+        audio_stage = already(audio_path)
+    else:
+        # Fingerprint of what the writer works from: the grouped articles plus length and speed.
+        # Requests whose inputs differ but group to the same articles share (and cache) one script.
+        script_key = cache_key("script", ordered_grouped, chosen_length, chosen_speed)
+        cached = await asyncio.to_thread(result_cache.get, script_key) or {}
+        script = cached.get("script")
+        if script:
+            script_flight = None
+            script_source = completed_stream(script)
+        else:
+            with timings.span("prompt"):
+                user_prompt, prompt_stats = await asyncio.to_thread(
+                    encode_prompt, ordered_grouped, json_size, start_date, end_date, chosen_total_words
+                )
+            timings.count("prompt_tokens", prompt_stats["tokens"])
+            timings.count("prompt_tokens_saved", prompt_stats["saved_tokens"])
+            timings.count("prompt_articles_dropped", prompt_stats["articles"] - prompt_stats["included"])
+            prompt_tokens_saved_total.inc(prompt_stats["saved_tokens"])
+            script_flight = flights.join(
+                script_key,
+                lambda flight: generate_and_cache_script(script_key, system_prompt, user_prompt, flight.stream, timings),
+            )
+            script_source = script_flight.stream
+        script_relay = None
+        if job is not None:
+            script_relay = asyncio.create_task(relay(script_source, job.script_stream))
 
-    # Save script
-    script_path = tmp / "podcast_script.txt"
-    with open(script_path, "w", encoding="utf-8") as f:
-        f.write(script)
+        # Audio starts on completed paragraphs while the rest of the script is still being written
+        audio_path = artifact_store.path(job_id, "audio")
+        # Requests sharing a script share its audio: a cached script by its text, a new one by its flight
+        audio_flight_key = (
+            audio_key_for(script, chosen_voice, chosen_speed) if script_flight is None
+            else ("audio", script_flight, chosen_voice, chosen_speed)
+        )
+        # Audio already synthesized is worth keeping: the episode deadline never cuts it short
+        with deadline.lifted():
+            audio_flight = flights.join(
+                audio_flight_key,
+                lambda flight: produce_audio(
+                    script_flight, script, script_source, chosen_voice, chosen_speed, audio_path, flight.stream
+                ),
+            )
+            audio_stage = asyncio.create_task(run_stage(
+                job, errors, "audio", receive_audio(audio_flight, audio_path, job), audio_timeout, timings
+            ))
+        try:
+            with timings.span("script"):
+                if script_flight is not None:
+                    script = await flights.wait(script_flight)
+                if script_relay is not None:
+                    await script_relay
+        except BaseException:
+            audio_stage.cancel()
+            raise
 
-    # Generate summary
-    summary_response = client.responses.create(
-        model="gpt-4o-mini",
-        instructions="Summarize the input in a few sentences very clearly.",
-        input=script
-    )
-    summary = summary_response.output_text
-    summary_path = tmp / "podcast_summary.txt"
-    with open(summary_path, "w", encoding="utf-8") as f:
-        f.write(summary)
+        # Save script
+        script_path = artifact_store.path(job_id, "script")
+        record_bytes("script", await asyncio.to_thread(write_text, script_path, script), timings)
 
-    # Generate title
-    title_response = client.responses.create(
-        model="gpt-4o-mini",
-        instructions="Create a concise, compelling podcast episode title (max 30 characters) based on the following script. No quotation marks; return only the title.",
-        input=script
+    # Summary and title only depend on the script, so run them alongside the audio
+    report(job, "finishing")
+    summary, episode_title, audio_path = await asyncio.gather(
+        run_stage(
+            job, errors, "summary",
+            cached_or_run(cached.get("summary"), lambda: flights.do((script_key, "summary"), lambda: generate_summary(script, timings))),
+            summary_timeout, timings,
+        ),
+        run_stage(
+            job, errors, "title",
+            cached_or_run(cached.get("title"), lambda: flights.do((script_key, "title"), lambda: generate_title(script, timings))),
+            title_timeout, timings,
+        ),
+        audio_stage,
     )
-    episode_title = title_response.output_text.strip()
-    title_path = tmp / "podcast_title.txt"
-    with open(title_path, "w", encoding="utf-8") as f:
-        f.write(episode_title)
-
-    # Generate audio
-    audio_path = tmp / "podcast_audio.mp3"
-    with client.audio.speech.with_streaming_response.create(
-        model="gpt-4o-mini-tts",
-        voice=voice_map[chosen_voice],
-        input=script,
-        instructions="Read the script of a podcast.",
-        speed=speed_map[chosen_speed]
-    ) as audio_response:
-        audio_response.stream_to_file(audio_path)
-
-    print("Output before return:", output)
+    if summary is not None:
+        await asyncio.to_thread(write_text, artifact_store.path(job_id, "summary"), summary)
+    if episode_title is not None:
+        await asyncio.to_thread(write_text, artifact_store.path(job_id, "title"), episode_title)
+    if (summary, episode_title) != (cached.get("summary"), cached.get("title")):
+        await asyncio.to_thread(result_cache.set, script_key, {
+            "script": script,
+            "summary": summary if summary is not None else cached.get("summary"),
+            "title": episode_title if episode_title is not None else cached.get("title"),
+        })
+
+    if audio_path is not None:
+        record_bytes("audio", (await asyncio.to_thread(os.stat, audio_path)).st_size, timings)
+    episodes_total.inc(mode=podcast_input.chosen_mode, outcome="partial" if errors else "ok")
+    print("Episode", job_id, json.dumps(timings.to_dict()))
     return {
+        "job_id": job_id,
         "script": script,
         "summary": summary,
         "title": episode_title,
-        "audio_path": str(audio_path),
-        "json_output": output
+        "audio_path": str(audio_path) if audio_path else None,
+        "json_output": output,
+        "errors": errors,
+        "metrics": timings.to_dict(),
     }
 
+@app.get("/stats")
+async def stats():
+    return {
+        "in_flight": flights.stats(),
+        "upstream": governor.stats(),
+        "news_cache": news_cache.stats(),
+        "result_cache": result_cache.stats(),
+        "warming": warmer.stats_dict(),
+        "article_pool": article_pool.stats() if article_pool is not None else None,
+        "article_store": await asyncio.to_thread(article_store.stats) if article_store is not None else None,
+    }
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+def admit():
+    # Backpressure: turn new work away while upstream calls are already queueing up
+    try:
+        governor.admit()
+    except Overloaded as e:
+        raise HTTPException(
+            status_code=503, detail="Server is busy, try again later", headers={"Retry-After": str(e.retry_after)}
+        )
+
+async def until_disconnected(request, interval=0.5):
+    while not await request.is_disconnected():
+        await asyncio.sleep(interval)
+
+async def unless_disconnected(request, coro):
+    # Awaits coro, cancelling it if the client goes away first
+    work = asyncio.ensure_future(coro)
+    watch = asyncio.create_task(until_disconnected(request))
+    try:
+        done, _ = await asyncio.wait({work, watch}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        watch.cancel()
+        if not work.done():
+            work.cancel()
+    if work not in done:
+        cancelled_total.inc(reason="disconnect")
+        raise HTTPException(status_code=499, detail="Client closed request")
+    return work.result()
+
+@app.post("/generate_podcast")
+async def generate_podcast(podcast_input: PodcastInput, request: Request):
+    admit()
+    record_demand(podcast_input)
+    # Identical requests (same input and date window) share one pipeline run. If the client leaves,
+    # only this request's wait is cancelled; the run, and each stage it shares, stops once nobody waits.
+    return await unless_disconnected(
+        request, flights.do(request_key(podcast_input), lambda: run_pipeline(podcast_input, budget=episode_deadline))
+    )
+
+@app.post("/jobs", status_code=202)
+async def submit_job(podcast_input: PodcastInput):
+    admit()
+    record_demand(podcast_input)
+    try:
+        job = job_manager.submit(podcast_input, lambda job: run_pipeline(podcast_input, job))
+    except JobQueueFull:
+        raise HTTPException(status_code=503, detail="Too many jobs in progress, try again later")
+    return job.to_dict()
+
+def get_job_or_404(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    job = get_job_or_404(job_id)
+    if not job_manager.cancel(job_id):
+        raise HTTPException(status_code=409, detail=f"Job already {job.status}")
+    cancelled_total.inc(reason="job")
+    # Cancellation unwinds quickly; report the job once it has
+    await asyncio.wait({job.task}, timeout=5)
+    return job.to_dict()
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    job = get_job_or_404(job_id)
+    status = job.to_dict()
+    if job.status == "completed":
+        status["result"] = job.result
+    return status
+
+@app.get("/jobs/{job_id}/audio/stream")
+async def stream_job_audio(job_id: str):
+    # Plays back audio while it is still being synthesized; falls back to the file once done
+    job = get_job_or_404(job_id)
+    if job.audio_stream is None:
+        return serve_artifact(job_id, "audio")
+    return StreamingResponse(job.audio_stream.subscribe(), media_type="audio/mpeg")
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def script_events(job):
+    try:
+        async for delta in job.script_stream.subscribe():
+            yield sse_event("delta", {"text": delta})
+    except Exception as e:
+        yield sse_event("error", {"detail": str(e) or e.__class__.__name__})
+        return
+    yield sse_event("done", {})
+
+async def finished_script_events(job_id):
+    script_path = artifact_store.find(job_id, "script")
+    if script_path is None:
+        yield sse_event("error", {"detail": "Script not found"})
+        return
+    yield sse_event("delta", {"text": await asyncio.to_thread(script_path.read_text, encoding="utf-8")})
+    yield sse_event("done", {})
+
+@app.get("/jobs/{job_id}/script/stream")
+async def stream_job_script(job_id: str):
+    # Server-Sent Events: "delta" events carry script text as it is written, then "done" or "error"
+    job = get_job_or_404(job_id)
+    events = script_events(job) if job.script_stream is not None else finished_script_events(job_id)
+    return StreamingResponse(events, media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.get("/jobs/{job_id}/{artifact}")
+async def job_artifact(job_id: str, artifact: str):
+    job = get_job_or_404(job_id)
+    if job.status != "completed":
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    return serve_artifact(job_id, artifact)
+
+def serve_artifact(job_id, artifact):
+    if artifact not in ARTIFACT_FILES:
+        raise HTTPException(status_code=404, detail="Unknown artifact")
+    file_path = artifact_store.find(job_id, artifact)
+    if file_path is None:
+        raise HTTPException(status_code=404, detail="File not found")
+    return FileResponse(str(file_path))
+
+@app.get("/download/{job_id}/{file_type}")
+async def download_job_file(job_id: str, file_type: str):
+    return serve_artifact(job_id, file_type)
+
+# Legacy route: serves the artifacts of the most recently finished generation
 @app.get("/download/{file_type}")
 async def download_file(file_type: str):
-    file_map = {
-        "script": tmp / "podcast_script.txt",
-        "summary": tmp / "podcast_summary.txt",
-        "title": tmp / "podcast_title.txt",
-        "audio": tmp / "podcast_audio.mp3",
-        "json": tmp / "podsmith_output.json"
-    }
-    file_path = file_map.get(file_type)
-    if not file_path.exists():
+    if latest_job_id is None:
         raise HTTPException(status_code = 404, detail = "File not found")
-    return FileResponse(str(file_path))
+    return serve_artifact(latest_job_id, file_type)
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port = 8000)
\ No newline at end of file
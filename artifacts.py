@@ -0,0 +1,78 @@
+import re
+import shutil
+import time
+from pathlib import Path
+
+# Artifact names exposed over the API and the file each one is stored in
+ARTIFACT_FILES = {
+    "script": "podcast_script.txt",
+    "summary": "podcast_summary.txt",
+    "title": "podcast_title.txt",
+    "audio": "podcast_audio.mp3",
+    "json": "podsmith_output.json",
+}
+
+_valid_key = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+class ArtifactStore:
+    """One directory per key (job id), evicted by age and by total size."""
+
+    def __init__(self, root, max_bytes=2 * 1024 ** 3, max_age=24 * 3600):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.pinned = set()
+
+    def dir_for(self, key):
+        if not _valid_key.match(key):
+            raise ValueError(f"Invalid artifact key: {key!r}")
+        return self.root / key
+
+    def create(self, key):
+        # Directories in use are pinned so eviction never removes them mid-write
+        self.pinned.add(key)
+        path = self.dir_for(key)
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def release(self, key):
+        self.pinned.discard(key)
+        path = self.dir_for(key)
+        if path.exists():
+            path.touch()
+
+    def path(self, key, artifact):
+        return self.dir_for(key) / ARTIFACT_FILES[artifact]
+
+    def find(self, key, artifact):
+        # Returns the artifact path if it exists, otherwise None
+        if artifact not in ARTIFACT_FILES or not _valid_key.match(key):
+            return None
+        path = self.path(key, artifact)
+        return path if path.exists() else None
+
+    def evict(self):
+        now = time.time()
+        entries = []
+        for path in self.root.iterdir():
+            if not path.is_dir() or path.name in self.pinned:
+                continue
+            try:
+                mtime = path.stat().st_mtime
+                size = sum(f.stat().st_size for f in path.iterdir() if f.is_file())
+            except FileNotFoundError:
+                continue
+            entries.append((mtime, size, path))
+
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for mtime, size, path in entries:
+            if now - mtime <= self.max_age and total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            removed += 1
+        return removed
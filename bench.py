@@ -0,0 +1,394 @@
+"""Offline benchmarks for the podcast pipeline.
+
+    python bench.py micro [--sizes 100,1000,10000,100000]
+    python bench.py load [--requests 40] [--concurrency 8] [--distinct 4]
+    python bench.py serve [--port 8100]
+    python bench.py check [--trials 300] [--seed 0]
+
+"micro" times deduplication, grouping and prompt serialization on synthetic
+corpora. "load" runs /generate_podcast end to end against local stand-ins for
+NewsAPI and OpenAI (see fakes.py) and reports latency percentiles and
+throughput. "serve" only runs the stand-ins, e.g. to point a deployed copy of
+the app at them with NEWSAPI_URL and OPENAI_BASE_URL. "check" compares the
+optimized keyword matching and source resolution with the straightforward
+code they replaced on random inputs, and exits non-zero on the first
+difference. For the approximate fuzzy dedup it checks that every title
+dropped really is a near-duplicate, and that recall stays above a floor.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import shutil
+import statistics
+import tempfile
+import time
+from fakes import UpstreamServer, fake_upstream, synthetic_articles, synthetic_titles
+from prompt import estimate_tokens
+
+KEYWORD_SETS = [["Tesla", "Knicks"], ["Nvidia"], ["Congress", "Senate"], ["NASA", "Apple", "Fed"], []]
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def timed(fn, repeat):
+    # Best and median wall time of repeat runs, plus the last result
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return min(times), statistics.median(times), result
+
+
+def row(name, n, best, median, note=""):
+    print(f"{name:<28} {n:>8} {best * 1000:>11.2f} {median * 1000:>11.2f}  {note}")
+
+
+def run_micro(args):
+    os.environ.setdefault("NEWSAPI_KEY", "bench")
+    os.environ.setdefault("OPENAI_KEY", "bench")
+    import app
+    from dedup import dedup_articles, fuzzy_dedup, fuzzy_dedup_reference, normalize_title
+
+    selection = app.source_registry.select({"General": ["CNN"], "Politics": []})
+    chosen_categories = ["General", "Sports", "Technology"]
+    keywords = ["Tesla", "Knicks", "Nvidia", "Congress", "Senate"]
+    print(f"{'benchmark':<28} {'n':>8} {'best ms':>11} {'median ms':>11}")
+    for n in args.sizes:
+        raw = synthetic_articles(n, ("cnn", "espn", "techcrunch"), dup_rate=args.dup_rate, seed=n)
+        reformatted = app.reformat_articles(raw, selection)
+        repeat = max(1, min(args.repeat, 100_000 // n))
+
+        if args.dedup_max is None or n <= args.dedup_max:
+            best, median, kept = timed(lambda: fuzzy_dedup(reformatted, threshold=0.9), repeat)
+            row("fuzzy_dedup", n, best, median, f"{len(kept)} kept")
+            if n <= args.reference_max:
+                ref_best, ref_median, ref_kept = timed(lambda: fuzzy_dedup_reference(reformatted, threshold=0.9), 1)
+                # The index is approximate, so it may keep a near-duplicate the reference drops
+                row("fuzzy_dedup_reference", n, ref_best, ref_median, f"{ref_best / best:.1f}x slower, {len(ref_kept)} kept")
+            best, median, final = timed(lambda: dedup_articles(reformatted, threshold=0.9), repeat)
+            row("dedup_articles", n, best, median, f"{len(final)} kept")
+        else:
+            for name in ("fuzzy_dedup", "dedup_articles"):
+                print(f"{name:<28} {n:>8} {'-':>11} {'-':>11}  skipped, above --dedup-max {args.dedup_max}")
+            # Exact-title dedup only, so grouping and serialization still see a corpus of this size
+            final = list({normalize_title(a["title"]): a for a in reversed(reformatted)}.values())[::-1]
+
+        best, median, grouped = timed(lambda: app.group_articles(final, chosen_categories, keywords), repeat)
+        row("group_articles", n, best, median, f"{sum(len(a) for kw in grouped.values() for a in kw.values())} placed")
+
+        output = {"settings/input": {"categories": chosen_categories, "keywords": keywords}, "articles/output": grouped}
+        best, median, prompt = timed(lambda: json.dumps(output, indent=2), repeat)
+        row("prompt json.dumps", n, best, median, f"~{estimate_tokens(prompt)} tokens")
+        best, median, (digest, stats) = timed(
+            lambda: app.prompt_encoder.encode(grouped, "2025-07-01", "2025-07-08", 750), repeat
+        )
+        row("prompt compact digest", n, best, median, f"~{stats['tokens']} tokens, {stats['included']}/{stats['articles']} articles")
+
+
+def load_payload(i, distinct):
+    return {
+        "chosen_categories": ["General", "Sports", "Technology"],
+        "chosen_keywords": KEYWORD_SETS[i % distinct % len(KEYWORD_SETS)],
+        "chosen_general_sources": ["CNN", "Associated Press"],
+        "chosen_political_sources": ["Fox News"],
+        "chosen_length": 5,
+        "chosen_timeframe": 1 + i % distinct // len(KEYWORD_SETS),
+        "chosen_speed": "Normal",
+        "chosen_voice": "male1",
+        "chosen_mode": "full",
+    }
+
+
+async def drive(app_module, args):
+    import httpx
+
+    transport = httpx.ASGITransport(app=app_module.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as http:
+        slots = asyncio.Semaphore(args.concurrency)
+        latencies = []
+        failures = 0
+
+        async def one(i):
+            nonlocal failures
+            async with slots:
+                start = time.perf_counter()
+                response = await http.post("/generate_podcast", json=load_payload(i, args.distinct))
+                elapsed = time.perf_counter() - start
+                if response.status_code == 200:
+                    latencies.append(elapsed)
+                else:
+                    failures += 1
+                    print("Request failed:", response.status_code, response.text[:200])
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(args.requests)))
+        wall = time.perf_counter() - start
+        metrics_text = (await http.get("/metrics")).text
+    return latencies, failures, wall, metrics_text
+
+
+def stage_means(metrics_text):
+    sums, counts = {}, {}
+    for line in metrics_text.splitlines():
+        for suffix, target in (("_sum", sums), ("_count", counts)):
+            prefix = f"dailycast_stage_seconds{suffix}{{"
+            if line.startswith(prefix):
+                labels, value = line[len(prefix):].split("} ")
+                stage = labels.split('"')[1]
+                target[stage] = target.get(stage, 0) + float(value)
+    return {stage: (sums[stage] / counts[stage], int(counts[stage])) for stage in sums if counts.get(stage)}
+
+
+def run_load(args):
+    upstream = fake_upstream(
+        news_latency=args.news_latency,
+        llm_latency=args.llm_latency,
+        tts_latency=args.tts_latency,
+        articles_per_source=args.articles_per_source,
+        script_words=args.script_words,
+        openai_limit=args.openai_limit,
+        slow_rate=args.slow_rate,
+    )
+    artifact_dir = tempfile.mkdtemp(prefix="dailycast_bench_")
+    with UpstreamServer(upstream) as server:
+        # The app reads its configuration at import time
+        os.environ.update({
+            "NEWSAPI_KEY": "bench",
+            "OPENAI_KEY": "bench",
+            "NEWSAPI_URL": server.url + "/v2",
+            "OPENAI_BASE_URL": server.url + "/v1",
+            "ARTIFACT_DIR": artifact_dir,
+        })
+        os.environ.setdefault("NEWSAPI_RATE", "1000")
+        import app
+        try:
+            latencies, failures, wall, metrics_text = asyncio.run(drive(app, args))
+        finally:
+            shutil.rmtree(artifact_dir, ignore_errors=True)
+        calls = dict(upstream.state.calls)
+        lanes = app.governor.stats()
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}, {args.distinct} distinct configurations")
+    print(f"ok {len(latencies)}, failed {failures}, wall {wall:.2f}s, throughput {len(latencies) / wall:.2f} req/s")
+    if latencies:
+        print(" ".join(f"p{p} {percentile(latencies, p):.3f}s" for p in (50, 95, 99)), f"max {max(latencies):.3f}s")
+    print("upstream calls:", calls)
+    for field in ("retried", "failed", "hedged", "hedge_wins"):
+        print(f"{field}:", {lane: stats[field] for lane, stats in lanes.items()})
+    for stage, (mean, count) in sorted(stage_means(metrics_text).items(), key=lambda item: -item[1][0]):
+        print(f"  {stage:<12} mean {mean:.3f}s over {count}")
+
+
+def run_serve(args):
+    upstream = fake_upstream(
+        news_latency=args.news_latency,
+        llm_latency=args.llm_latency,
+        tts_latency=args.tts_latency,
+        articles_per_source=args.articles_per_source,
+        script_words=args.script_words,
+        openai_limit=args.openai_limit,
+        slow_rate=args.slow_rate,
+    )
+    with UpstreamServer(upstream, port=args.port) as server:
+        print(f"NEWSAPI_URL={server.url}/v2 OPENAI_BASE_URL={server.url}/v1")
+        try:
+            while True:
+                time.sleep(60)
+        except KeyboardInterrupt:
+            pass
+
+
+def reference_keyword_matches(title, keywords):
+    # Pre-KeywordMatcher behaviour: one \b...\b pattern per keyword
+    patterns = {kw: re.compile(r"\b" + re.escape(kw) + r"\b", re.IGNORECASE) for kw in keywords}
+    return [kw for kw, pattern in patterns.items() if pattern.search(title)]
+
+
+def reference_sources(app, general, political, chosen_categories):
+    # Pre-SourceRegistry behaviour: overwrite General and Politics, then map every source in category order
+    categories = dict(app.categories)
+    categories["General"] = [app.source_map_input.get(s, s.lower().replace(" ", "-")) for s in general]
+    categories["Politics"] = [app.source_map_input.get(s, s.lower().replace(" ", "-")) for s in political]
+    chosen_sources = list(dict.fromkeys(s for category in chosen_categories for s in categories[category]))
+    source_to_category = {}
+    for category, sources in categories.items():
+        for s in sources:
+            source_to_category[s] = category
+            source_to_category[app.source_display_names.get(s, s)] = category
+    return chosen_sources, source_to_category
+
+
+def clip(value, limit=400):
+    text = repr(value)
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
+def differs(name, case, got, expected):
+    print(f"{name}: DIFFERS for {clip(case)}\n  got      {clip(got)}\n  expected {clip(expected)}")
+    raise SystemExit(1)
+
+
+def check_keywords(rng, trials):
+    from keywords import KeywordMatcher
+
+    # Multi-word, punctuation-led, regex-special and non-ASCII keywords, and the case-folding corner cases
+    pool = ["Tesla", "tesla", "Knicks", "Fed", "Federal Reserve", "AI", "A.I.", "C++", ".NET", "S&P 500", "U.S.",
+            "New York", "York", "Zürich", "zurich", "İstanbul", "istanbul", "ſtock", "stock", "e-mail", "#1", "x"]
+    titles = synthetic_titles(trials, seed=rng.randrange(1 << 30))
+    cases = 0
+    for title in titles:
+        words = title.split()
+        keywords = rng.sample(pool, rng.randrange(0, len(pool))) + rng.sample(words, min(len(words), rng.randrange(3)))
+        for _ in range(rng.randrange(4)):
+            words.insert(rng.randrange(len(words) + 1), rng.choice(pool + keywords) if keywords else rng.choice(pool))
+        title = " ".join(words)
+        got = KeywordMatcher(keywords).matches(title)
+        expected = reference_keyword_matches(title, keywords)
+        if got != expected:
+            differs("keywords", (title, keywords), got, expected)
+        cases += 1
+    print(f"keywords: {cases} titles, KeywordMatcher matches the per-keyword regexes")
+
+
+def edit(title, rng):
+    # title with a few characters dropped, repeated or replaced
+    chars = list(title)
+    for _ in range(rng.randrange(1, 4)):
+        if not chars:
+            break
+        i = rng.randrange(len(chars))
+        action = rng.randrange(3)
+        if action == 0:
+            del chars[i]
+        elif action == 1:
+            chars.insert(i, chars[i])
+        else:
+            chars[i] = rng.choice("aeiou ")
+    return "".join(chars)
+
+
+def check_dedup(rng, trials, min_recall=0.98):
+    from difflib import SequenceMatcher
+    from dedup import dedup_articles, fuzzy_dedup, normalize_title
+
+    # The index is approximate: every drop must be a real near-duplicate of a title kept before it,
+    # and kept titles that are near-duplicates of an earlier kept one count as misses
+    def similar(a, b, threshold):
+        return SequenceMatcher(None, normalize_title(a), normalize_title(b)).ratio() >= threshold
+
+    dropped = {"fuzzy_dedup": 0, "dedup_articles": 0}
+    missed = dict(dropped)
+    for _ in range(trials):
+        titles = synthetic_titles(rng.randrange(1, 60), dup_rate=rng.random(), seed=rng.randrange(1 << 30))
+        # Edits near the threshold, short and empty titles are where the index could go wrong
+        titles += [edit(rng.choice(titles), rng) for _ in range(rng.randrange(10))]
+        titles += ["".join(rng.choice("ab ") for _ in range(rng.randrange(8))) for _ in range(rng.randrange(5))]
+        rng.shuffle(titles)
+        articles = [{"title": title} for title in titles]
+        threshold = rng.choice([0.85, 0.9, 0.9, 0.95, 1.0])
+        for name, fn in (("fuzzy_dedup", fuzzy_dedup), ("dedup_articles", dedup_articles)):
+            kept = fn(articles, threshold)
+            kept_ids = {id(a) for a in kept}
+            earlier = []
+            for article in articles:
+                title = article["title"]
+                duplicate = any(similar(title, k, threshold) for k in earlier)
+                if id(article) in kept_ids:
+                    missed[name] += duplicate
+                    earlier.append(title)
+                elif duplicate:
+                    dropped[name] += 1
+                else:
+                    differs(name, (titles, threshold), "dropped " + repr(title), "kept")
+    for name in dropped:
+        recall = dropped[name] / max(1, dropped[name] + missed[name])
+        print(f"dedup: {trials} corpora, {name} dropped {dropped[name]} near-duplicates and missed {missed[name]} (recall {recall:.4f})")
+        if recall < min_recall:
+            differs(name, f"recall over {trials} corpora", round(recall, 4), f">= {min_recall}")
+
+
+def check_sources(rng, trials):
+    os.environ.setdefault("NEWSAPI_KEY", "bench")
+    os.environ.setdefault("OPENAI_KEY", "bench")
+    import app
+
+    names = list(app.source_map_input) + [app.source_display_names.get(s, s) for c in app.categories.values() for s in c]
+    names += ["ESPN", "TechCrunch", "Some Local Paper"]
+    lookups = [key for s in app.categories.values() for key in s] + names + list(app.source_display_names.values()) + [None, "unknown"]
+    for _ in range(trials):
+        general = rng.sample(names, rng.randrange(0, 5))
+        political = rng.sample(names, rng.randrange(0, 5))
+        chosen = rng.sample(list(app.categories), rng.randrange(0, len(app.categories) + 1))
+        selection = app.source_registry.select({"General": general, "Politics": political})
+        expected_sources, source_to_category = reference_sources(app, general, political, chosen)
+        got = selection.sources_for(chosen)
+        if got != expected_sources:
+            differs("sources", (general, political, chosen), got, expected_sources)
+        for _ in range(20):
+            source_id, source_name = rng.choice(lookups), rng.choice(lookups)
+            got = selection.category_for(source_id, source_name)
+            expected = source_to_category.get(source_id, source_to_category.get(source_name, "Unknown"))
+            if got != expected:
+                differs("categories", (general, political, source_id, source_name), got, expected)
+    print(f"sources: {trials} selections, SourceRegistry matches the per-request category rebuild")
+
+
+def run_check(args):
+    rng = random.Random(args.seed)
+    check_keywords(rng, args.trials * 10)
+    check_dedup(rng, args.trials)
+    check_sources(rng, args.trials)
+
+
+def sizes(text):
+    return [int(n) for n in text.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the podcast pipeline")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    micro = commands.add_parser("micro", help="dedup, grouping and prompt serialization on synthetic corpora")
+    micro.add_argument("--sizes", type=sizes, default=[100, 1000, 10000, 100000])
+    micro.add_argument("--dup-rate", type=float, default=0.2)
+    micro.add_argument("--repeat", type=int, default=5)
+    micro.add_argument("--dedup-max", type=int, default=None, help="largest corpus to run fuzzy dedup on (default: all); larger ones get a skipped row")
+    micro.add_argument("--reference-max", type=int, default=500, help="largest corpus to run the quadratic reference on")
+    micro.set_defaults(run=run_micro)
+
+    check = commands.add_parser("check", help="compare optimized matching, dedup and source lookup with the code they replaced")
+    check.add_argument("--trials", type=int, default=300)
+    check.add_argument("--seed", type=int, default=0)
+    check.set_defaults(run=run_check)
+
+    for name, run in (("load", run_load), ("serve", run_serve)):
+        command = commands.add_parser(name)
+        command.add_argument("--news-latency", type=float, default=0.2)
+        command.add_argument("--llm-latency", type=float, default=1.0)
+        command.add_argument("--tts-latency", type=float, default=0.5)
+        command.add_argument("--articles-per-source", type=int, default=20)
+        command.add_argument("--script-words", type=int, default=750)
+        command.add_argument("--openai-limit", type=int, default=0, help="OpenAI calls in flight before the fake returns 429")
+        command.add_argument("--slow-rate", type=float, default=0.0, help="fraction of upstream calls that take 10x longer")
+        command.set_defaults(run=run)
+    commands.choices["load"].add_argument("--requests", type=int, default=40)
+    commands.choices["load"].add_argument("--concurrency", type=int, default=8)
+    commands.choices["load"].add_argument("--distinct", type=int, default=4, help="distinct request configurations")
+    commands.choices["serve"].add_argument("--port", type=int, default=8100)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+
+def cache_key(*parts):
+    # Stable digest of any JSON-serializable key parts
+    raw = json.dumps(parts, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class TTLCache:
+    """LRU cache whose entries expire after ttl seconds, optionally backed by a directory.
+
+    Values must be JSON-serializable when disk_dir is set. Memory is bounded by
+    maxsize entries; the disk copy lets a restarted instance reuse recent results.
+    """
+
+    def __init__(self, maxsize=256, ttl=900, disk_dir=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        if self.disk_dir is not None:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def _disk_path(self, key):
+        return self.disk_dir / f"{key}.json"
+
+    def get(self, key, default=None):
+        now = time.time()
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] > now:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self.entries[key]
+
+        value = self._load(key, now)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+        return value
+
+    def set(self, key, value, ttl=None):
+        # ttl overrides the cache's own for this entry
+        expires = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._store(key, expires, value)
+        if self.disk_dir is not None:
+            path = self._disk_path(key)
+            tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"expires": expires, "value": value}, f, ensure_ascii=False)
+            tmp_path.replace(path)
+            self._writes += 1
+            if self._writes % self.maxsize == 0:
+                self.purge_disk()
+
+    def purge_disk(self):
+        # Drop expired files so the directory stays bounded by what is still fresh
+        now = time.time()
+        for path in self.disk_dir.glob("*.json"):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    expired = json.load(f)["expires"] <= now
+            except (FileNotFoundError, ValueError, KeyError):
+                expired = True
+            if expired:
+                path.unlink(missing_ok=True)
+
+    def _store(self, key, expires, value):
+        self.entries[key] = (expires, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def _load(self, key, now):
+        if self.disk_dir is None:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if entry["expires"] <= now:
+            path.unlink(missing_ok=True)
+            return None
+        with self._lock:
+            self._store(key, entry["expires"], entry["value"])
+        return entry["value"]
+
+    def stats(self):
+        return {
+            "size": len(self.entries),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
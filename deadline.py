@@ -0,0 +1,62 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Monotonic time by which the current request must be done; tasks inherit it when they are created
+_deadline = ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+@contextmanager
+def budget(seconds):
+    """Run the block, and every task it starts, within seconds from now.
+
+    Budgets nest: an inner budget never extends the outer deadline. A falsy
+    seconds leaves the current deadline (if any) as it is.
+    """
+    if not seconds:
+        yield
+        return
+    at = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(at if current is None else min(current, at))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+@contextmanager
+def lifted():
+    """Run the block without a deadline, for work shared with other requests.
+
+    Tasks started in the block inherit no deadline either; each caller bounds its
+    own wait for the shared result instead.
+    """
+    token = _deadline.set(None)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining():
+    # Seconds left in the current budget, or None without one
+    at = _deadline.get()
+    return None if at is None else max(0.0, at - time.monotonic())
+
+
+def clamp(timeout):
+    # The smaller of timeout and the time left; None means no limit
+    left = remaining()
+    if left is None:
+        return timeout
+    return left if timeout is None else min(timeout, left)
+
+
+def check():
+    if remaining() == 0:
+        raise DeadlineExceeded("Request deadline reached")
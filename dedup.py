@@ -0,0 +1,187 @@
+import hashlib
+import math
+from collections import defaultdict
+from difflib import SequenceMatcher
+
+
+def normalize_title(t: str):
+    return " ".join((t or "").lower().split())
+
+
+def _grams(text, q):
+    # Repeats of a q-gram are numbered, so set intersection counts them like a multiset would
+    seen = defaultdict(int)
+    grams = set()
+    for i in range(len(text) - q + 1):
+        gram = text[i:i + q]
+        grams.add(f"{gram}#{seen[gram]}" if gram in seen else gram)
+        seen[gram] += 1
+    return frozenset(grams)
+
+
+# MinHash values are 15 bits, packed into 16-bit lanes of one int so lanes can be compared all at once
+LANE = 16
+
+
+def _lanes(count, value):
+    return sum(value << (LANE * i) for i in range(count))
+
+
+class NearDuplicateIndex:
+    """Finds titles whose SequenceMatcher ratio to an indexed title is >= threshold.
+
+    Candidates come from MinHash locality-sensitive hashing over each title's
+    q-grams: the signature holds bands * rows minimum hashes, and two titles are
+    compared only when all rows of at least one band agree, which for q-gram
+    sets with Jaccard similarity J happens with probability
+    1 - (1 - J ** rows) ** bands. Candidates whose signatures agree on less than
+    min_jaccard of their hashes (an estimate of J) are dropped too. Survivors
+    are confirmed with the same SequenceMatcher call as the brute-force version,
+    after a length bound and quick_ratio (both upper bounds on ratio), so a
+    reported match is always real.
+
+    The trade-off is recall. Titles at ratio >= 0.9 nearly always share more
+    than half their 3-grams, which the defaults pair up with probability above
+    0.99, while titles that merely share some words (J around 0.3) are rarely
+    compared. Heavily edited near-duplicates, those sharing fewer grams, and
+    thresholds well below the 0.9 the defaults are tuned for can be missed. In
+    exchange a lookup reads a few buckets instead of scanning the index, so its
+    cost grows with the number of similar titles, not of all titles. Hashes are
+    deterministic, so the same input always gives the same result.
+    """
+
+    def __init__(self, threshold=0.9, q=3, bands=30, rows=5, min_jaccard=0.5):
+        self.threshold = threshold
+        self.q = q
+        self.bands = bands
+        self.rows = rows
+        self.size = bands * rows
+        self.min_agree = math.ceil(min_jaccard * self.size)
+        self.guards = _lanes(self.size, 1 << 15)
+        self.ones = _lanes(self.size, 0x7FFF)
+        self.band_mask = (1 << (LANE * rows)) - 1
+        self.texts = []
+        self.signatures = []
+        self.matchers = []
+        self.buckets = [defaultdict(list) for _ in range(bands)]
+        # Packed hashes of every gram seen so far; headlines reuse a limited set of grams
+        self.gram_hashes = {}
+        self.comparisons = 0
+
+    def _length_range(self, la):
+        t = self.threshold
+        if t <= 0:
+            return 0, math.inf
+        return math.ceil(la * t / (2 - t) - 1e-9), math.floor(la * (2 - t) / t + 1e-9)
+
+    def _hashes(self, gram):
+        packed = self.gram_hashes.get(gram)
+        if packed is None:
+            # All of a gram's hashes come from one extendable-output digest, two bytes per lane
+            digest = hashlib.shake_128(gram.encode("utf-8")).digest(2 * self.size)
+            packed = self.gram_hashes[gram] = int.from_bytes(digest, "little") & self.ones
+        return packed
+
+    def _signature(self, text):
+        # Titles shorter than q are hashed whole, so they can still meet their exact copies
+        guards, ones = self.guards, self.ones
+        signature = None
+        for gram in _grams(text, self.q) or (text,):
+            hashes = self._hashes(gram)
+            if signature is None:
+                signature = hashes
+                continue
+            # Per lane, the guard bit of (signature + 2**15 - hashes) says signature >= hashes
+            ge = (signature + guards - hashes) & guards
+            take = ge - (ge >> 15)
+            signature = (hashes & take) | (signature & (ones ^ take))
+        return signature
+
+    def _band_keys(self, signature):
+        width = LANE * self.rows
+        return [(signature >> (width * i)) & self.band_mask for i in range(self.bands)]
+
+    def _agree(self, a, b):
+        # Lanes where two signatures hold the same hash; a nonzero lane of a ^ b carries into its guard bit
+        return self.size - (((a ^ b) + self.ones) & self.guards).bit_count()
+
+    def find(self, text, signature=None):
+        # Index of an indexed text that text is a near-duplicate of, or None
+        if signature is None:
+            signature = self._signature(text)
+        docs = set()
+        for bucket, key in zip(self.buckets, self._band_keys(signature)):
+            docs.update(bucket.get(key, ()))
+        low, high = self._length_range(len(text))
+        for doc in sorted(docs):
+            if not low <= len(self.texts[doc]) <= high:
+                continue
+            if self._agree(signature, self.signatures[doc]) < self.min_agree:
+                continue
+            # quick_ratio bounds ratio from above and is far cheaper, b's counts being kept per doc
+            matcher = self.matchers[doc]
+            matcher.set_seq1(text)
+            if matcher.quick_ratio() < self.threshold:
+                continue
+            self.comparisons += 1
+            if matcher.ratio() >= self.threshold:
+                return doc
+        return None
+
+    def add(self, text, signature=None):
+        doc = len(self.texts)
+        if signature is None:
+            signature = self._signature(text)
+        self.texts.append(text)
+        self.signatures.append(signature)
+        self.matchers.append(SequenceMatcher(None, "", text))
+        for bucket, key in zip(self.buckets, self._band_keys(signature)):
+            bucket[key].append(doc)
+        return doc
+
+    def find_or_add(self, text):
+        # find(text), adding text when it matches nothing; hashes it once for both
+        signature = self._signature(text)
+        doc = self.find(text, signature)
+        if doc is None:
+            self.add(text, signature)
+        return doc
+
+
+def fuzzy_dedup(articles, threshold=0.9):
+    # Keeps the first article of every group of near-identical titles
+    index = NearDuplicateIndex(threshold)
+    kept = []
+    for art in articles:
+        t = normalize_title(art["title"])
+        if index.find_or_add(t) is not None:
+            continue
+        kept.append(art)
+    return kept
+
+
+def dedup_articles(articles, threshold=0.9):
+    # Exact then fuzzy title dedup in one pass, normalizing every title once
+    index = NearDuplicateIndex(threshold)
+    seen = set()
+    kept = []
+    for art in articles:
+        t = normalize_title(art["title"])
+        if t in seen:
+            continue
+        seen.add(t)
+        if index.find_or_add(t) is not None:
+            continue
+        kept.append(art)
+    return kept
+
+
+def fuzzy_dedup_reference(articles, threshold=0.9):
+    # Original quadratic implementation, kept to check fuzzy_dedup against
+    kept = []
+    for art in articles:
+        t = normalize_title(art["title"])
+        if any(SequenceMatcher(None, t, normalize_title(k["title"])).ratio() >= threshold for k in kept):
+            continue
+        kept.append(art)
+    return kept
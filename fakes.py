@@ -0,0 +1,257 @@
+import asyncio
+import json
+import random
+import socket
+import threading
+import time
+import zlib
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+SUBJECTS = [
+    "Tesla", "Apple", "The Knicks", "The Fed", "Congress", "NASA", "OpenAI", "The Lakers", "Amazon",
+    "The Senate", "Microsoft", "The Yankees", "Nvidia", "The White House", "Google", "The Supreme Court",
+]
+VERBS = [
+    "unveils", "delays", "wins", "loses", "announces", "cuts", "expands", "investigates", "approves",
+    "rejects", "launches", "recalls", "reports", "faces", "signs", "blocks",
+]
+OBJECTS = [
+    "new battery plant", "record quarterly earnings", "playoff opener", "interest rate decision",
+    "spending bill", "moon mission", "safety review", "trade deadline deal", "antitrust case",
+    "chip export rules", "climate package", "ticket price hike", "data center project", "budget talks",
+]
+QUALIFIERS = [
+    "amid criticism", "after long delay", "in surprise move", "as rivals struggle", "despite warnings",
+    "ahead of schedule", "for the first time", "in overtime thriller", "under pressure", "",
+]
+PLACES = [
+    "in Texas", "in New York", "in Europe", "in China", "in California", "in Ohio", "at the Garden",
+    "in Washington", "in Berlin", "in Tokyo", "in Florida", "in Chicago", "in Brazil", "in India", "",
+]
+
+# One MPEG-1 Layer III frame (128 kbps, 44.1 kHz): a 4-byte header and 413 bytes of silence
+MP3_FRAME = b"\xff\xfb\x90\x00" + b"\x00" * 413
+
+
+SYLLABLES = ["ka", "lo", "ven", "mar", "ti", "zu", "ber", "sha", "no", "quin", "ra", "del", "fo", "gri", "yan", "ost"]
+
+
+def _name(rng):
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randrange(2, 4))).title()
+
+
+def _variant(title, rng):
+    # A near-duplicate as syndicated copies of a story tend to look
+    choice = rng.randrange(4)
+    if choice == 0:
+        return title.upper() if rng.random() < 0.1 else title.lower()
+    if choice == 1:
+        return title + rng.choice([" - report", " (updated)", ".", " | live"])
+    if choice == 2:
+        return title.replace(" ", "  ", 1)
+    words = title.split()
+    i = rng.randrange(len(words))
+    words[i] = words[i][:-1] if len(words[i]) > 3 else words[i]
+    return " ".join(words)
+
+
+def synthetic_titles(n, dup_rate=0.2, seed=0):
+    rng = random.Random(seed)
+    titles = []
+    for _ in range(n):
+        if titles and rng.random() < dup_rate:
+            titles.append(_variant(rng.choice(titles), rng))
+        else:
+            parts = [rng.choice(SUBJECTS), rng.choice(VERBS), rng.choice(OBJECTS), rng.choice(PLACES), rng.choice(QUALIFIERS)]
+            # Names keep the vocabulary open-ended, as real headlines are
+            parts.insert(rng.choice((0, 3, 5)), _name(rng) + ("'s" if rng.random() < 0.5 else ":"))
+            titles.append(" ".join(p for p in parts if p))
+    return titles
+
+
+def synthetic_articles(n, sources=("cnn", "espn", "techcrunch"), dup_rate=0.2, seed=0, start_day=1, description_words=40):
+    """NewsAPI-shaped articles with realistic near-duplicate titles."""
+    rng = random.Random(seed)
+    articles = []
+    for i, title in enumerate(synthetic_titles(n, dup_rate, seed)):
+        source = sources[i % len(sources)]
+        day = start_day + rng.randrange(7)
+        articles.append({
+            "source": {"id": source, "name": source.replace("-", " ").title()},
+            "author": None,
+            "title": title,
+            "description": " ".join(rng.choice(OBJECTS) for _ in range(description_words // 3)),
+            "url": f"https://example.com/{source}/{seed}/{i}",
+            "urlToImage": None,
+            "publishedAt": f"2025-07-{day:02d}T{rng.randrange(24):02d}:00:00Z",
+            "content": "Lorem ipsum " * 10,
+        })
+    return articles
+
+
+def fake_upstream(news_latency=0.2, llm_latency=1.0, tts_latency=0.5, articles_per_source=20,
+                  script_words=750, audio_frames=240, openai_limit=0, slow_rate=0.0, seed=0):
+    """A FastAPI app standing in for NewsAPI /v2/everything and the OpenAI responses and speech APIs.
+
+    Latencies are means in seconds (each call sleeps 0.5x-1.5x of it); payload
+    size is set by articles per source, script words and MP3 frames per speech call.
+    With openai_limit set, OpenAI calls beyond that many in flight get a 429.
+    A slow_rate fraction of calls takes ten times as long, for a latency tail.
+    """
+    upstream = FastAPI()
+    rng = random.Random(seed)
+    upstream.state.calls = {"news": 0, "llm": 0, "tts": 0, "rate_limited": 0}
+    in_flight = {"openai": 0}
+
+    async def delay(mean):
+        tail = 10 if rng.random() < slow_rate else 1
+        await asyncio.sleep(mean * rng.uniform(0.5, 1.5) * tail)
+
+    def rate_limited():
+        if not openai_limit or in_flight["openai"] < openai_limit:
+            return None
+        upstream.state.calls["rate_limited"] += 1
+        return JSONResponse(
+            {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+            status_code=429,
+            headers={"retry-after": "1"},
+        )
+
+    @upstream.get("/v2/everything")
+    async def everything(request: Request):
+        upstream.state.calls["news"] += 1
+        await delay(news_latency)
+        params = request.query_params
+        sources = [s for s in params.get("sources", "").split(",") if s] or ["cnn"]
+        page = int(params.get("page", "1"))
+        page_size = int(params.get("pageSize", "100"))
+        total = articles_per_source * len(sources)
+        corpus = synthetic_articles(total, tuple(sources), seed=zlib.crc32(",".join(sources).encode()) + seed)
+        return {
+            "status": "ok",
+            "totalResults": total,
+            "articles": corpus[(page - 1) * page_size:page * page_size],
+        }
+
+    def usage(text, output):
+        return {
+            "input_tokens": len(text) // 4,
+            "output_tokens": len(output) // 4,
+            "total_tokens": (len(text) + len(output)) // 4,
+            "input_tokens_details": {"cached_tokens": 0},
+            "output_tokens_details": {"reasoning_tokens": 0},
+        }
+
+    def response_body(text, body):
+        return {
+            "id": "resp_fake",
+            "object": "response",
+            "created_at": int(time.time()),
+            "model": body.get("model", "fake"),
+            "status": "completed",
+            "output": [{
+                "type": "message",
+                "id": "msg_fake",
+                "role": "assistant",
+                "status": "completed",
+                "content": [{"type": "output_text", "text": text, "annotations": []}],
+            }],
+            "usage": usage(str(body.get("input", "")), text),
+        }
+
+    def write(body):
+        instructions = body.get("instructions", "")
+        if "JSON object" in instructions:
+            return json.dumps({"intro": "Welcome to the show.", "transitions": ["Next up."] * 50, "outro": "See you tomorrow."})
+        if "podcast writer" in instructions:
+            words = script_words if "one segment" not in instructions else max(60, script_words // 8)
+            sentences = [f"Here is sentence {i} of the story, told in a calm voice." for i in range(words // 12 + 1)]
+            return "\n\n".join(" ".join(sentences[i:i + 5]) for i in range(0, len(sentences), 5))
+        if "title" in instructions:
+            return "Fake Daily Brief"
+        return "A short summary of the episode."
+
+    @upstream.post("/v1/responses")
+    async def responses(request: Request):
+        upstream.state.calls["llm"] += 1
+        refused = rate_limited()
+        if refused is not None:
+            return refused
+        body = await request.json()
+        text = write(body)
+        if not body.get("stream"):
+            in_flight["openai"] += 1
+            try:
+                await delay(llm_latency)
+            finally:
+                in_flight["openai"] -= 1
+            return response_body(text, body)
+
+        async def events():
+            # Latency is spread over the stream, as tokens arrive from a real model
+            in_flight["openai"] += 1
+            try:
+                words = text.split(" ")
+                step = max(1, len(words) // 20)
+                for i in range(0, len(words), step):
+                    await delay(llm_latency / 20)
+                    delta = " ".join(words[i:i + step]) + (" " if i + step < len(words) else "")
+                    event = {"type": "response.output_text.delta", "delta": delta, "item_id": "msg_fake",
+                             "output_index": 0, "content_index": 0, "sequence_number": i + 1, "logprobs": []}
+                    yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+                event = {"type": "response.completed", "sequence_number": len(words) + 1, "response": response_body(text, body)}
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+            finally:
+                in_flight["openai"] -= 1
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @upstream.post("/v1/audio/speech")
+    async def speech(request: Request):
+        upstream.state.calls["tts"] += 1
+        refused = rate_limited()
+        if refused is not None:
+            return refused
+        body = await request.json()
+        in_flight["openai"] += 1
+        try:
+            await delay(tts_latency)
+        finally:
+            in_flight["openai"] -= 1
+        # Longer input, longer audio, capped at audio_frames
+        frames = max(1, min(audio_frames, len(body.get("input", "")) // 10))
+        return Response(MP3_FRAME * frames, media_type="audio/mpeg")
+
+    @upstream.exception_handler(Exception)
+    async def failed(request, exc):
+        return JSONResponse({"error": {"message": str(exc)}}, status_code=500)
+
+    return upstream
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class UpstreamServer:
+    """Runs a fake upstream app with uvicorn on a background thread."""
+
+    def __init__(self, upstream, port=None):
+        self.port = port or free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.server = uvicorn.Server(uvicorn.Config(upstream, host="127.0.0.1", port=self.port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join()
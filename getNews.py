@@ -1,392 +1,191 @@
-import os
-import requests
-import re
-import json
-from dotenv import load_dotenv
-from datetime import datetime, timedelta, timezone
-from collections import defaultdict
-from difflib import SequenceMatcher
-from pathlib import Path
-from openai import OpenAI
-
-load_dotenv()
-NEWSAPI_KEY = os.getenv("NEWSAPI_KEY")
-client = OpenAI(
-    api_key = os.getenv("OPENAI_KEY")
-)
-speech_file_path = Path(__file__).parent / "podcast_audio.mp3"
-
-# Mapping categories to source names
-categories = {
-    "General": [],
-    "Politics": [],
-    "Business": ["financial-post", "business-insider", "fortune", "bloomberg", "the-wall-street-journal"],
-    "Technology": ["techcrunch", "wired", "the-verge", "engadget", "ars-technica"],
-    "Science": ["national-geographic", "new-scientist", "next-big-future"],
-    "Health": ["medical-news-today"],
-    "Entertainment": ["buzzfeed", "mtv-news", "entertainment-weekly", "ign", "polygon"],
-    "Sports": ["espn", "fox-sports", "the-sport-bible", "bleacher-report", "talksport"],
-}
-
-# Map NewsAPI source IDs to real names
-source_display_names = {
-    "breitbart-news": "Breitbart News",
-    "the-amercian-conservative": "The American Conservative",
-    "fox-news": "Fox News",
-    "the-jerusalem-post": "The Jerusalem Post",
-    "the-hill": "The Hill",
-    "associated-press": "Associated Press",
-    "usa-today": "USA Today",
-    "cbs-news": "CBS News",
-    "nbc-news": "NBC News",
-    "abc-news": "ABC News",
-    "cnn": "CNN",
-    "msnbc": "MSNBC",
-    "financial-post": "Financial Post",
-    "business-insider": "Business Insider",
-    "fortune": "Fortune",
-    "bloomberg": "Bloomberg",
-    "the-wall-street-journal": "The Wall Street Journal",
-    "techcrunch": "TechCrunch",
-    "wired": "Wired",
-    "the-verge": "The Verge",
-    "engadget": "Engadget",
-    "ars-technica": "Ars Technica",
-    "national-geographic": "National Geographic",
-    "new-scientist": "New Scientist",
-    "next-big-future": "Next Big Future",
-    "medical-news-today": "Medical News Today",
-    "buzzfeed": "BuzzFeed",
-    "mtv-news": "MTV News",
-    "entertainment-weekly": "Entertainment Weekly",
-    "ign": "IGN",
-    "polygon": "Polygon",
-    "espn": "ESPN",
-    "fox-sports": "Fox Sports",
-    "the-sport-bible": "SportBible",
-    "bleacher-report": "Bleacher Report",
-    "talksport": "talkSPORT",
-}
-
-source_map_input = {
-    "Breitbart": "breitbart-news",
-    "American Conservative": "the-amercian-conservative",
-    "Fox News": "fox-news",
-    "The Jerusalem Post": "the-jerusalem-post",
-    "The Hill": "the-hill",
-    "Associated Press": "associated-press",
-    "USA Today": "usa-today",
-    "CBS": "cbs-news",
-    "NBC": "nbc-news",
-    "ABC": "abc-news",
-    "CNN": "cnn",
-    "MSNBC": "msnbc",
-}
-
-# Choose options
-chosen_categories = ["General", "Sports"]
-chosen_keywords = ["Tesla", "Knicks"]
-chosen_general_sources = ["Breitbart", "Fox News", "CNN", "Associated Press"]
-chosen_political_sources = ["Breitbart", "Fox News", "CNN", "Associated Press"]
-chosen_length = 5
-chosen_timeframe = 2
-chosen_speed = "Normal"
-chosen_voice = "male1"
-categories["General"] = [
-    source_map_input.get(src, src.lower().replace(' ', '-'))
-    for src in chosen_general_sources
-]
-categories["Politics"] = [
-    source_map_input.get(src, src.lower().replace(' ', '-'))
-    for src in chosen_political_sources
-]
-voice_map = {
-    "male1": "ballad",
-    "male2": "echo",
-    "female1": "fable",
-    "female2": "shimmer"
-}
-speed_map = {
-    "Slow": 0.75,
-    "Normal": 1,
-    "Fast": 1.25,
-    "Very Fast": 1.5,
-}
-wpm_map = {
-    "Slow": 134,
-    "Normal": 178,
-    "Fast": 223,
-    "Very Fast": 267,
-}
-chosen_total_words = chosen_length * wpm_map[chosen_speed]
-low_bound_words = int(chosen_total_words * 0.99)
-high_bound_words = int(chosen_total_words * 1.01)
-today = datetime.now(timezone.utc)
-start_dt = today - timedelta(days = chosen_timeframe)
-start_date = start_dt.strftime('%Y-%m-%d')
-end_date = today.strftime('%Y-%m-%d')
-
-# Get sources from chosen categories
-chosen_sources = []
-for category in chosen_categories:
-    for cat in categories[category]:
-        chosen_sources.append(cat)
-chosen_sources = list(dict.fromkeys(chosen_sources))
-
-display_sources = [
-    source_display_names.get(src_id, src_id) for src_id in chosen_sources
-]
-
-source_removals = set()
-chosen_sources = [s for s in chosen_sources if s not in source_removals]
-
-source_to_category = {}
-for category, source in categories.items():
-    for s in source:
-        source_to_category.setdefault(s, category)
-
-# NewsAPI pull request
-def fetch_articles():
-    query_sources = ",".join(chosen_sources)
-    query_keywords = " OR ".join(chosen_keywords)
-    params = {
-        "apiKey": NEWSAPI_KEY,
-        "sources": query_sources,
-        "qInTitle": query_keywords,
-        "from": start_date,
-        "to": end_date,
-        "pageSize": 100,
-        "sortBy": "popularity",
-        "language": "en",
-    }
-    data = requests.get("https://newsapi.org/v2/everything", params = params, timeout = 30)
-    return data.json()
-
-def normalize_title(t: str):
-    return " ".join((t or "").lower().split())
-
-def fuzzy_dedup(articles, threshold = 0.9):
-    kept = []
-    for art in articles:
-        t = normalize_title(art["title"])
-        if any(SequenceMatcher(None, t, normalize_title(k["title"])).ratio() >= threshold for k in kept):
-            continue
-        kept.append(art)
-    return kept
-raw_payload = fetch_articles()
-raw_articles = raw_payload.get("articles", [])
-total_reported = raw_payload.get("totalResults")
-
-# Reformat data
-reformatted = []
-for a in raw_articles:
-    src = a.get("source", {})
-    src_name = src.get("name")
-    src_id = src.get("id")
-    primary_category = source_to_category.get(src_id, source_to_category.get(src_name, "Unknown"))
-
-    published_raw = a.get("publishedAt") or ""
-    if "T" in published_raw:
-        published_date = published_raw.split("T")[0]
-    else:
-        published_date = published_raw
-
-    reformatted.append({
-        "source": src_name,
-        "primary_category": primary_category,
-        "title": a.get("title") or "",
-        "description": a.get("description") or "",
-        "content": a.get("content") or "",
-        "url": a.get("url"),
-        "image": a.get("urlToImage"),
-        "publishedAt": published_date,
-    })
-
-# Dedup
-seen = set()
-exact_dedup = []
-for art in reformatted:
-    nt = normalize_title(art["title"])
-    if nt in seen:
-        continue
-    seen.add(nt)
-    exact_dedup.append(art)
-
-# Fuzzy dedup
-final_articles = fuzzy_dedup(exact_dedup, threshold = 0.9)
-
-# Sort by category order then oldest first
-category_order = {category: i for i, category in enumerate(chosen_categories)}
-def to_date(s):
-    try:
-        return datetime.strptime(s, "%Y-%m-%d")
-    except Exception:
-        return datetime.max
-
-# Output
-output = {
-    "settings/input": {
-        "categories": chosen_categories,
-        "keywords": chosen_keywords,
-        "sources": display_sources,
-        "start_date": start_date,
-        "end_date": end_date,
-        "timeframe_days": chosen_timeframe,
-        "podcast_length_min": chosen_length,
-        "speech_speed": chosen_speed,
-        "voice": voice_map[chosen_voice],
-        "results_reported": len(final_articles),
-        "generated_at": today.isoformat()
-    }
-}
+"""Batch episode generation.
 
-def clean_field(s: str) -> str:
-    if s is None:
-        return ""
-    s = s.replace('\r', ' ')
-    s = s.replace('\n', '')
-    s = re.sub(r'\s+', ' ', s).strip()
-    return s
+    python getNews.py jobs.jsonl --out batch_out [--workers 8] [--llm-concurrency 8] [--tts-concurrency 16] [--retries 2]
 
-# Clean text before grouping
-for art in final_articles:
-    for field in ("title", "description", "content"):
-        art[field] = clean_field(art.get(field, ""))
+jobs.jsonl holds one PodcastInput-shaped JSON object per line (a JSON array
+works too), each optionally with an "id". Every episode's files are written to
+<out>/<id>/ and every finished job is appended to <out>/progress.jsonl, so an
+interrupted batch picks up where it stopped when run again.
 
-# Group articles
-keyword_patterns = {
-    kw: re.compile(r'\b' + re.escape(kw) + r'\b', re.IGNORECASE)
-    for kw in chosen_keywords
-}
-
-grouped = defaultdict(lambda: defaultdict(list))
-
-for art in final_articles:
-    cat = art.get("primary_category", "Unknown")
-    title_lc = (art.get("title") or "").lower()
-    matched_any = False
-    for kw, pat in keyword_patterns.items():
-        if pat.search(title_lc):
-            grouped[cat][kw].append(art)
-            matched_any = True
-    if not chosen_keywords:
-        grouped[cat]["__NO_KEYWORDS__"].append(art)
-    elif not matched_any:
-        grouped[cat]["__UNMATCHED__"].append(art)
-
-def to_date(s):
-    try:
-        return datetime.strptime(s, "%Y-%m-%d")
-    except Exception:
-        return datetime.min
-
-# Sort each group by date
-for kwdict in grouped.values():
-    for arts in kwdict.values():
-        arts.sort(key=lambda a: to_date(a.get("publishedAt", "")), reverse = False)
-
-keyword_position = {kw: i for i, kw in enumerate(chosen_keywords)}
-def keyword_order_key(kw):
-    if kw == "__UNMATCHED__":
-        return (1_000_000, kw)
-    if kw == "__NO_KEYWORDS__":
-        return (1_000_001, kw)
-    return (0, keyword_position.get(kw, 9_999_999))
-
-# Preserve chosen category order
-ordered_grouped = {}
-for cat in chosen_categories:
-    if cat in grouped:
-        kwdict = grouped[cat]
-        ordered_grouped[cat] = {
-            kw: kwdict[kw] for kw in sorted(kwdict.keys(), key = keyword_order_key)
-        }
-
-output["articles/output"] = ordered_grouped
-output["group article counts"] = {
-    cat: {kw: len(arts) for kw, arts in kwdict.items()}
-    for cat, kwdict in ordered_grouped.items()
-}
-
-with open("podsmith_output.json", "w", encoding = "utf-8") as f:
-    json.dump(output, f, indent = 2, ensure_ascii = False)
-
-system_prompt = f"""
-You are an award‑winning podcast writer. Using only the structured JSON news data (with each top‑level key representing a category and its articles in chronological order), produce one seamless, conversational podcast script in natural paragraphs. Follow these rules absolutely:
-You must write **between {low_bound_words} and {high_bound_words} words** (95%–105% of {chosen_total_words}).  
-1. Draft your script normally.  
-2. If the count is outside the bounds, automatically trim or expand to hit the target, then output the final script.
-• Use all fields from the JSON (titles, summaries, sources, publication dates, etc.) without inventing any new events or quotes. Reasonable, widely known context or inferences are allowed.  
-• Do not use headings, lists, bullet points, links, or any markdown.  
-• Create one flowing segment per category, in the JSON’s given order. Within each, cover its articles in the order they appear.  
-• Open with a concise, attention‑grabbing hook that previews the episode’s top stories and time frame.  
-• Employ smooth, conversational transitions between segments (e.g., “Now, let’s turn to our next story…”).  
-• End with a brief sign‑off and a teaser for tomorrow’s episode.  
-• Write entirely in natural, spoken‑style paragraphs—ready for recording.
-
-Output only the raw script text.
+Episodes run through the same pipeline as the API. Jobs share one article
+pool, so each source window is fetched once per batch. Caches live under
+<out>/.cache, so a retried or resumed job reuses the script and audio it
+already has. LLM calls and TTS requests are capped across all episodes.
 """
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import shutil
+import statistics
+import time
+import traceback
+from pathlib import Path
+from dotenv import load_dotenv
 
-user_prompt = json.dumps(output, indent = 2)
-
-# Save to a .txt file
-full_prompt = system_prompt + "\n\n" + user_prompt
-with open("podcast_prompt.txt", "w", encoding = "utf-8") as f:
-    f.write(full_prompt)
-with open("podcast_prompt.txt", "r", encoding = "utf-8") as f:
-    full_prompt = f.read()
-
-# Call the API
-response = client.responses.create(
-    model = "gpt-4o-mini",
-    instructions = system_prompt,
-    input = user_prompt
-)
-
-script = response.output_text
-
-# Extract and save the script
-with open("podcast_script.txt", "w", encoding = "utf-8") as f:
-    f.write(response.output_text)
-
-print("Saved podcast_script.txt")
-
-with open("podcast_script.txt", "r", encoding="utf-8") as f:
-    text = f.read()
-
-# Summarize podcast
-response = client.responses.create(
-    model = "gpt-4o-mini",
-    instructions = "Summarize the input in a few sentences very clearly.",
-    input = script
-)
-with open("podcast_summary.txt", "w", encoding = "utf-8") as f:
-    f.write(response.output_text)
-print("Saved podcast_summary.txt")
-
-# Create podcast title
-title_resp = client.responses.create(
-    model = "gpt-4o-mini",
-    instructions = (
-        "Create a concise, compelling podcast episode title (max 30 characters) "
-        "based on the following script."
-        "No quotation marks; return only the title."
-    ),
-    input = script
-)
-episode_title = title_resp.output_text.strip()
-with open("podcast_title.txt", "w", encoding="utf-8") as f:
-    f.write(episode_title)
-print("Saved podcast_title.txt")
-
-# Get the voice recording / text to speech
-with client.audio.speech.with_streaming_response.create(
-    model = "gpt-4o-mini-tts",
-    voice = voice_map[chosen_voice],
-    input = script,
-    instructions = "Read the script of a podcast.",
-    speed = speed_map[chosen_speed]
-) as response:
-    response.stream_to_file(speech_file_path)
 
-print("Saved podcast_audio.mp3")
\ No newline at end of file
+def load_jobs(path):
+    text = Path(path).read_text(encoding="utf-8")
+    specs = json.loads(text) if text.lstrip().startswith("[") else [
+        json.loads(line) for line in text.splitlines() if line.strip()
+    ]
+    jobs = []
+    for i, spec in enumerate(specs):
+        job_id = re.sub(r"[^A-Za-z0-9_.-]", "_", str(spec.pop("id", f"job-{i + 1:05d}")))
+        jobs.append((job_id, spec))
+    return jobs
+
+
+def load_progress(path):
+    done = {}
+    if path.exists():
+        for line in path.read_text(encoding="utf-8").splitlines():
+            if line.strip():
+                record = json.loads(line)
+                done[record["id"]] = record
+    return done
+
+
+class Batch:
+    def __init__(self, app, args, out):
+        self.app = app
+        self.args = args
+        self.out = out
+        self.progress_path = out / "progress.jsonl"
+        self.records = []
+
+    def save(self, job_id, result):
+        # Copies the episode's files out of the artifact store before eviction can reach them
+        job_dir = self.out / job_id
+        job_dir.mkdir(parents=True, exist_ok=True)
+        for artifact, filename in self.app.ARTIFACT_FILES.items():
+            source = self.app.artifact_store.find(result["job_id"], artifact)
+            if source is not None:
+                shutil.copyfile(source, job_dir / filename)
+
+    async def run_job(self, job_id, spec):
+        app = self.app
+        started = time.perf_counter()
+        record = {"id": job_id, "attempts": 0}
+        try:
+            podcast_input = app.PodcastInput(**spec)
+        except Exception as e:
+            return {**record, "status": "invalid", "error": str(e)}
+        for attempt in range(self.args.retries + 1):
+            record["attempts"] = attempt + 1
+            try:
+                result = await app.flights.do(
+                    app.request_key(podcast_input), lambda: app.run_pipeline(podcast_input)
+                )
+                await asyncio.to_thread(self.save, job_id, result)
+                record.update(status="ok" if not result["errors"] else "partial", title=result["title"],
+                              errors=result["errors"], metrics=result["metrics"])
+                if not result["errors"]:
+                    break
+            except Exception as e:
+                traceback.print_exc()
+                record.update(status="failed", error=str(e) or e.__class__.__name__)
+            if attempt < self.args.retries:
+                # Retries reuse whatever the failed attempt already cached (articles, script, audio)
+                await asyncio.sleep(min(30, 2 ** attempt) * (0.5 + random.random()))
+        record["seconds"] = round(time.perf_counter() - started, 2)
+        return record
+
+    async def worker(self, queue, progress):
+        while True:
+            job_id, spec = await queue.get()
+            try:
+                record = await self.run_job(job_id, spec)
+                self.records.append(record)
+                progress.write(json.dumps(record) + "\n")
+                progress.flush()
+                print(f"[{len(self.records)}/{queue.total}] {job_id}: {record['status']} in {record.get('seconds', 0)}s")
+            finally:
+                queue.task_done()
+
+    async def run(self, jobs):
+        app = self.app
+        queue = asyncio.Queue()
+        queue.total = len(jobs)
+        for job in jobs:
+            queue.put_nowait(job)
+        with open(self.progress_path, "a", encoding="utf-8") as progress:
+            workers = [asyncio.create_task(self.worker(queue, progress)) for _ in range(self.args.workers)]
+            try:
+                await queue.join()
+            finally:
+                for task in workers:
+                    task.cancel()
+                await app.http_client.aclose()
+
+
+def report(records, skipped, wall, app):
+    statuses = {}
+    for record in records:
+        statuses[record["status"]] = statuses.get(record["status"], 0) + 1
+    finished = statuses.get("ok", 0) + statuses.get("partial", 0)
+    print(f"\n{len(records)} jobs run, {skipped} already done: {statuses}")
+    print(f"wall {wall:.1f}s, throughput {finished / wall * 60 if wall else 0:.1f} episodes/min")
+
+    stages, counts = {}, {}
+    for record in records:
+        metrics = record.get("metrics") or {}
+        for stage, seconds in metrics.get("timings", {}).items():
+            stages.setdefault(stage, []).append(seconds)
+        for name, value in metrics.get("counts", {}).items():
+            counts[name] = counts.get(name, 0) + value
+    if stages:
+        print(f"{'stage':<12} {'n':>5} {'mean s':>8} {'p50 s':>8} {'p95 s':>8}")
+        for stage, values in sorted(stages.items(), key=lambda item: -statistics.mean(item[1])):
+            values.sort()
+            p95 = values[min(len(values) - 1, int(len(values) * 0.95))]
+            print(f"{stage:<12} {len(values):>5} {statistics.mean(values):>8.2f} {statistics.median(values):>8.2f} {p95:>8.2f}")
+    tokens = {name: value for name, value in counts.items() if name.endswith("_tokens")}
+    if tokens:
+        print("tokens:", tokens)
+    print("NewsAPI requests:", app.newsapi.requests, "| coalesced:", app.flights.stats())
+    print("upstream retries:", {lane: stats["retried"] for lane, stats in app.governor.stats().items()})
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Generate a batch of podcast episodes")
+    parser.add_argument("jobs", help="JSON lines (or a JSON array) of PodcastInput objects")
+    parser.add_argument("--out", default="batch_out", help="output directory")
+    parser.add_argument("--workers", type=int, default=8, help="episodes generated at once")
+    parser.add_argument("--llm-concurrency", type=int, default=8, help="LLM calls in flight across episodes")
+    parser.add_argument("--tts-concurrency", type=int, default=16, help="TTS requests in flight across episodes")
+    parser.add_argument("--retries", type=int, default=2, help="retries for a failed or partial episode")
+    parser.add_argument("--no-resume", action="store_true", help="rerun jobs already in progress.jsonl")
+    args = parser.parse_args()
+
+    out = Path(args.out)
+    out.mkdir(parents=True, exist_ok=True)
+    cache = out / ".cache"
+    # Batch defaults, read by app at import: one shared article pool, caches that survive a restart
+    os.environ.setdefault("NEWS_BACKEND", "pool")
+    os.environ.setdefault("NEWS_CACHE_DIR", str(cache / "news"))
+    os.environ.setdefault("RESULT_CACHE_DIR", str(cache / "results"))
+    os.environ.setdefault("ARTIFACT_DIR", str(cache / "artifacts"))
+    # The governor's LLM and TTS lanes cap calls across all episodes, segments included
+    os.environ["LLM_CONCURRENCY"] = str(args.llm_concurrency)
+    os.environ["TTS_MAX_IN_FLIGHT"] = str(args.tts_concurrency)
+    # Jobs are queued here, so the governor never turns them away
+    os.environ["UPSTREAM_MAX_WAITING"] = "0"
+    import app
+
+    jobs = load_jobs(args.jobs)
+    done = {} if args.no_resume else load_progress(out / "progress.jsonl")
+    pending = [(job_id, spec) for job_id, spec in jobs if done.get(job_id, {}).get("status") != "ok"]
+    print(f"{len(jobs)} jobs, {len(jobs) - len(pending)} already done, {len(pending)} to run")
+
+    batch = Batch(app, args, out)
+    started = time.perf_counter()
+    asyncio.run(batch.run(pending))
+    report(batch.records, len(jobs) - len(pending), time.perf_counter() - started, app)
+
+
+if __name__ == "__main__":
+    main()
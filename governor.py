@@ -0,0 +1,264 @@
+import asyncio
+import math
+import random
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+import httpx
+import openai
+import deadline
+
+
+class TokenBucket:
+    """Allows rate calls per second on average, with bursts of up to burst calls."""
+
+    def __init__(self, rate=5.0, burst=10):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class Overloaded(Exception):
+    """A lane already has as many callers waiting as it accepts; retry_after is a hint in seconds."""
+
+    def __init__(self, lane, retry_after):
+        super().__init__(f"Too many {lane} calls waiting")
+        self.lane = lane
+        self.retry_after = retry_after
+
+
+def retryable(exc):
+    # Rate limits, upstream 5xx, timeouts and dropped connections are worth another try
+    if isinstance(exc, (httpx.TransportError, openai.APIConnectionError)):
+        return True
+    status = getattr(exc, "status_code", None)
+    return status is not None and (status == 429 or status >= 500)
+
+
+def retry_after(exc):
+    # Seconds the upstream asked us to wait, if its response said so
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class LatencyWindow:
+    """The last size latencies of one kind of call."""
+
+    def __init__(self, size=200, min_samples=20):
+        self.samples = deque(maxlen=size)
+        self.min_samples = min_samples
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+
+    def percentile(self, p):
+        # None until there are enough samples to trust
+        if len(self.samples) < self.min_samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+class Lane:
+    """Admission control for one upstream: a concurrency cap, an optional rate
+    limit and jittered retries.
+
+    run(call) awaits call() in a slot; hold(call) keeps the slot until its block
+    exits, for streamed responses. A call that fails with a retryable error is
+    retried after an exponential, jittered backoff (at least the upstream's
+    Retry-After), with its slot given up while it waits. Callers queue for
+    slots; once max_waiting are queued the governor turns new requests away.
+    No call starts, and no retry is scheduled, past the request's deadline.
+
+    run(call, hedge=kind) is for idempotent calls: if call() has not returned
+    after the p95 latency of that kind, a second copy is started and the first
+    to succeed wins. Hedges only use idle capacity, never a queued slot.
+    """
+
+    def __init__(self, name, concurrency=8, rate=0.0, burst=None, max_waiting=0, retries=3,
+                 base_delay=0.5, max_delay=8.0, hedging=True, hedge_min_delay=0.05):
+        self.name = name
+        self.concurrency = concurrency
+        self.bucket = TokenBucket(rate, burst or max(1, int(rate * 2))) if rate else None
+        self.max_waiting = max_waiting
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._slots = asyncio.Semaphore(concurrency)
+        self.in_flight = 0
+        self.waiting = 0
+        self.calls = 0
+        self.retried = 0
+        self.failed = 0
+        self.rejected = 0
+        self.hedging = hedging
+        self.hedge_min_delay = hedge_min_delay
+        self.latency = {}
+        self.hedged = 0
+        self.hedge_wins = 0
+        # Moving average of how long a slot is held, to estimate when a queued call will run
+        self.hold_seconds = 1.0
+
+    @asynccontextmanager
+    async def _slot(self):
+        deadline.check()
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        started = time.monotonic()
+        try:
+            if self.bucket is not None:
+                await self.bucket.acquire()
+            self.calls += 1
+            yield
+        finally:
+            self.in_flight -= 1
+            self.hold_seconds = 0.8 * self.hold_seconds + 0.2 * (time.monotonic() - started)
+            self._slots.release()
+
+    def _backoff(self, exc, attempt):
+        # Seconds to wait before the next attempt, or None when exc should propagate
+        if attempt >= self.retries or not retryable(exc):
+            self.failed += 1
+            return None
+        delay = min(self.max_delay, self.base_delay * 2 ** attempt) * (0.5 + random.random())
+        hinted = retry_after(exc)
+        if hinted is not None:
+            delay = max(delay, min(hinted, 60.0))
+        left = deadline.remaining()
+        if left is not None and left <= delay:
+            # The retry could not finish in time anyway
+            self.failed += 1
+            return None
+        self.retried += 1
+        print(f"{self.name} call failed ({exc.__class__.__name__}), retrying in {delay:.1f}s")
+        return delay
+
+    async def run(self, call, hedge=None):
+        if hedge is None or not self.hedging:
+            return await self._run(call)
+        return await self._hedged(call, self.latency.setdefault(hedge, LatencyWindow()))
+
+    async def _run(self, call):
+        attempt = 0
+        while True:
+            try:
+                async with self._slot():
+                    return await call()
+            except Exception as e:
+                delay = self._backoff(e, attempt)
+                if delay is None:
+                    raise
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _timed(self, call, window):
+        started = time.monotonic()
+        result = await self._run(call)
+        window.add(time.monotonic() - started)
+        return result
+
+    def _can_hedge(self, delay):
+        left = deadline.remaining()
+        return self.waiting == 0 and self.in_flight < self.concurrency and (left is None or left > delay)
+
+    async def _hedged(self, call, window):
+        p95 = window.percentile(95)
+        first = asyncio.create_task(self._timed(call, window))
+        tasks = {first}
+        try:
+            if p95 is not None:
+                delay = max(self.hedge_min_delay, p95)
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done and self._can_hedge(delay):
+                    self.hedged += 1
+                    tasks.add(asyncio.create_task(self._timed(call, window)))
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                succeeded = [task for task in done if task.exception() is None]
+                if succeeded:
+                    if first not in succeeded:
+                        self.hedge_wins += 1
+                    return succeeded[0].result()
+                if not tasks:
+                    # Every copy failed
+                    return done.pop().result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    @asynccontextmanager
+    async def hold(self, call):
+        # Only call() is retried: once the block has consumed part of a stream, starting over would repeat it
+        attempt = 0
+        while True:
+            async with self._slot():
+                try:
+                    result = await call()
+                except Exception as e:
+                    delay = self._backoff(e, attempt)
+                    if delay is None:
+                        raise
+                else:
+                    yield result
+                    return
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def overloaded(self):
+        return bool(self.max_waiting) and self.waiting >= self.max_waiting
+
+    def retry_after(self):
+        # Rough time until the queue ahead of a new caller drains
+        return max(1, math.ceil((self.waiting + 1) / self.concurrency * self.hold_seconds))
+
+    def stats(self):
+        return {
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "calls": self.calls,
+            "retried": self.retried,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+        }
+
+
+class Governor:
+    """The lanes that every upstream call of this process goes through, by name."""
+
+    def __init__(self, *lanes):
+        self.lanes = {lane.name: lane for lane in lanes}
+
+    def __getitem__(self, name):
+        return self.lanes[name]
+
+    def admit(self):
+        # New work is turned away while any lane's queue is full, rather than queued behind it
+        for lane in self.lanes.values():
+            if lane.overloaded():
+                lane.rejected += 1
+                raise Overloaded(lane.name, lane.retry_after())
+
+    def stats(self):
+        return {name: lane.stats() for name, lane in self.lanes.items()}
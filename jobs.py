@@ -0,0 +1,137 @@
+import asyncio
+import traceback
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from streams import Broadcast
+
+# Pipeline stages in the order they run, used to report progress
+STAGES = ["queued", "fetching", "processing", "script", "finishing", "completed"]
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, job_id, params):
+        self.id = job_id
+        self.params = params
+        self.status = "queued"
+        self.stage = "queued"
+        self.error = None
+        self.result = None
+        self.created_at = datetime.now(timezone.utc)
+        self.updated_at = self.created_at
+        self.task = None
+        # State of the stages that run concurrently, e.g. {"audio": "running"}
+        self.stages = {}
+        # Live script deltas and audio parts for clients following the job as it runs
+        self.script_stream = Broadcast()
+        self.audio_stream = Broadcast()
+
+    def set_stage(self, stage):
+        self.stage = stage
+        self.updated_at = datetime.now(timezone.utc)
+
+    def mark(self, name, state):
+        self.stages[name] = state
+        self.updated_at = datetime.now(timezone.utc)
+
+    def release_streams(self):
+        # Unblock any remaining listeners and drop the buffered data
+        for stream in (self.script_stream, self.audio_stream):
+            if stream is not None and not stream.closed:
+                stream.close(RuntimeError(self.error or "Stage did not complete"))
+        self.script_stream = None
+        self.audio_stream = None
+
+    @property
+    def progress(self):
+        if self.status == "completed":
+            return 1.0
+        return round(STAGES.index(self.stage) / (len(STAGES) - 1), 2) if self.stage in STAGES else 0.0
+
+    @property
+    def done(self):
+        return self.status in ("completed", "failed", "cancelled")
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": self.progress,
+            "stages": dict(self.stages),
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "updated_at": self.updated_at.isoformat(),
+        }
+
+
+class JobManager:
+    """Runs pipeline jobs in the background with a cap on how many run at once."""
+
+    def __init__(self, max_concurrent=4, max_queued=100, history=500):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.history = history
+        self.jobs = OrderedDict()
+        self._slots = None
+
+    @property
+    def slots(self):
+        # Created lazily so the semaphore binds to the running event loop
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+        return self._slots
+
+    def pending(self):
+        return sum(1 for job in self.jobs.values() if not job.done)
+
+    def submit(self, params, run):
+        # run(job) is the coroutine function that does the actual work
+        if self.pending() >= self.max_concurrent + self.max_queued:
+            raise JobQueueFull()
+        job = Job(uuid.uuid4().hex, params)
+        self.jobs[job.id] = job
+        job.task = asyncio.create_task(self._run(job, run))
+        self._trim()
+        return job
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id):
+        # Stops a queued or running job; work it shares with other requests carries on for them
+        job = self.jobs.get(job_id)
+        if job is None or job.done:
+            return False
+        job.task.cancel()
+        return True
+
+    async def _run(self, job, run):
+        try:
+            async with self.slots:
+                job.status = "running"
+                job.result = await run(job)
+                job.status = "completed"
+                job.set_stage("completed")
+        except asyncio.CancelledError:
+            # Cancelled through cancel(), queued or running; the task ends here
+            job.status = "cancelled"
+            job.error = "Cancelled"
+            job.updated_at = datetime.now(timezone.utc)
+        except Exception as e:
+            traceback.print_exc()
+            job.status = "failed"
+            job.error = str(e) or e.__class__.__name__
+            job.updated_at = datetime.now(timezone.utc)
+        finally:
+            job.release_streams()
+
+    def _trim(self):
+        # Forget the oldest finished jobs once the history limit is reached
+        finished = [job_id for job_id, job in self.jobs.items() if job.done]
+        for job_id in finished[:max(0, len(self.jobs) - self.history)]:
+            del self.jobs[job_id]
@@ -0,0 +1,63 @@
+import re
+from collections import defaultdict
+
+WORD = re.compile(r"\w+")
+
+# Up to this many keywords, one regex search per keyword is faster than the word index
+DIRECT_MAX = 4
+
+
+def keyword_pattern(keyword):
+    return re.compile(r"\b" + re.escape(keyword) + r"\b", re.IGNORECASE)
+
+
+class KeywordMatcher:
+    """Finds which keywords occur in a title in one pass over its words.
+
+    A keyword occurs when r"\\b<keyword>\\b" matches case-insensitively, the same
+    test as running one pattern per keyword. A keyword that starts with a word
+    character can only match where a word of the title starts, and that word
+    must equal the keyword's first word. So keywords are indexed by their first
+    word, and each word of the title looks up its candidates and confirms them
+    with their pattern at that position. The cost no longer grows with the
+    number of keywords.
+
+    Case-insensitive regex matching equates some non-ASCII letters with ASCII
+    ones (e.g. "İ" and "i", "ſ" and "s"), which str.lower() does not. So the
+    index only holds ASCII first words. A non-ASCII title word is checked
+    against every indexed keyword. Keywords that start with punctuation or a
+    non-ASCII word are searched for in the whole title.
+    """
+
+    def __init__(self, keywords):
+        self.keywords = list(dict.fromkeys(keywords))
+        self.patterns = {kw: keyword_pattern(kw) for kw in self.keywords}
+        self.by_first_word = defaultdict(list)
+        self.indexed = []
+        self.unindexed = []
+        for kw in self.keywords:
+            first = WORD.match(kw)
+            if first and first.group().isascii():
+                self.by_first_word[first.group().lower()].append(kw)
+                self.indexed.append(kw)
+            else:
+                self.unindexed.append(kw)
+
+    def matches(self, title):
+        # Matching keywords in the order they were given
+        if len(self.keywords) <= DIRECT_MAX:
+            return [kw for kw in self.keywords if self.patterns[kw].search(title)]
+        found = {kw for kw in self.unindexed if self.patterns[kw].search(title)}
+        if title.isascii() and self.by_first_word.keys().isdisjoint(WORD.findall(title.lower())):
+            # Most titles hold none of the keywords; a set check rules that out without a Python loop
+            return [kw for kw in self.keywords if kw in found] if found else []
+        for word in WORD.finditer(title):
+            text = word.group()
+            candidates = self.by_first_word.get(text.lower(), ()) if text.isascii() else self.indexed
+            for kw in candidates:
+                if kw not in found and self.patterns[kw].match(title, word.start()):
+                    found.add(kw)
+        return [kw for kw in self.keywords if kw in found] if found else []
+
+    def search(self, title):
+        return bool(self.matches(title))
@@ -0,0 +1,107 @@
+import asyncio
+import math
+import deadline
+from governor import Lane
+
+
+class NewsAPIError(Exception):
+    def __init__(self, code, message=None, response=None):
+        super().__init__(code, message)
+        # Lets the governor retry rate limits (429) and server errors and honour Retry-After
+        self.response = response
+        self.status_code = response.status_code if response is not None else None
+
+
+class NewsAPI:
+    """Paginated /v2/everything fetcher that splits sources into groups and fetches them concurrently.
+
+    Every page request goes through lane, which caps and paces them, retries
+    rate limits and server errors and hedges slow requests. A request waits at
+    most timeout seconds, less when the caller's deadline is nearer.
+    """
+
+    def __init__(self, http_client, api_key, base_url="https://newsapi.org/v2", group_size=5,
+                 max_pages=3, page_size=100, lane=None, timeout=30):
+        self.http_client = http_client
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.group_size = group_size
+        self.max_pages = max_pages
+        self.page_size = page_size
+        self.lane = lane or Lane("newsapi", concurrency=6, rate=5.0, burst=10)
+        self.timeout = timeout
+        self.requests = 0
+
+    async def get_page(self, params, page):
+        return await self.lane.run(lambda: self._get_page(params, page), hedge="page")
+
+    async def _get_page(self, params, page):
+        self.requests += 1
+        response = await self.http_client.get(
+            f"{self.base_url}/everything",
+            params={**params, "apiKey": self.api_key, "pageSize": self.page_size, "page": page},
+            timeout=deadline.clamp(self.timeout),
+        )
+        if response.status_code >= 500:
+            raise NewsAPIError(f"HTTP {response.status_code}", response.text[:200], response)
+        payload = response.json()
+        if payload.get("status") != "ok":
+            raise NewsAPIError(payload.get("code") or f"HTTP {response.status_code}", payload.get("message"), response)
+        return payload
+
+    async def fetch_all(self, params):
+        # First page tells us how many more pages there are; the rest run concurrently
+        first = await self.get_page(params, 1)
+        total = first.get("totalResults") or 0
+        pages = min(self.max_pages, math.ceil(total / self.page_size))
+        results = await asyncio.gather(
+            *(self.get_page(params, page) for page in range(2, pages + 1)),
+            return_exceptions=True,
+        )
+        articles = list(first.get("articles", []))
+        for result in results:
+            if isinstance(result, NewsAPIError) and result.args[0] == "maximumResultsReached":
+                # The plan's result cap was hit; keep what we have
+                continue
+            if isinstance(result, BaseException):
+                raise result
+            articles.extend(result.get("articles", []))
+        return articles, total
+
+    async def everything(self, sources, keywords, start_date, end_date, sort_by="popularity", language="en"):
+        """Fetch every page for the sources in groups and merge them, dropping repeated URLs.
+
+        Groups that fail are left out and counted in the payload's failedGroups,
+        so callers can tell a partial result from a complete one.
+        """
+        base = {"from": start_date, "to": end_date, "sortBy": sort_by, "language": language}
+        if keywords:
+            base["qInTitle"] = " OR ".join(keywords)
+        groups = [sources[i:i + self.group_size] for i in range(0, len(sources), self.group_size)] or [[]]
+        results = await asyncio.gather(
+            *(self.fetch_all({**base, "sources": ",".join(group)}) for group in groups),
+            return_exceptions=True,
+        )
+        failures = [r for r in results if isinstance(r, BaseException)]
+        if failures and len(failures) == len(results):
+            raise failures[0]
+        for failure in failures:
+            # One bad group (e.g. an unknown source id) should not sink the others
+            print("NewsAPI group failed:", repr(failure))
+
+        seen = set()
+        articles = []
+        total = 0
+        for result in results:
+            if isinstance(result, BaseException):
+                continue
+            group_articles, group_total = result
+            total += group_total
+            for article in group_articles:
+                url = article.get("url")
+                if url in seen:
+                    continue
+                if url:
+                    seen.add(url)
+                articles.append(article)
+        return {"status": "ok", "totalResults": total, "articles": articles, "failedGroups": len(failures)}
@@ -0,0 +1,75 @@
+import asyncio
+import time
+import traceback
+from singleflight import SingleFlight
+
+
+class ArticlePool:
+    """Shared per-source article windows, fetched once and reused by every request.
+
+    fetch(source_id, start_date, end_date) returns the raw NewsAPI articles for one
+    source. Windows that requests keep asking for are refreshed in the background;
+    windows nobody has used for idle_ttl seconds are dropped. Concurrent loads of
+    a window share one task, cancelled only once every request waiting on it has
+    gone.
+    """
+
+    def __init__(self, fetch, refresh_interval=600, idle_ttl=3600):
+        self.fetch = fetch
+        self.refresh_interval = refresh_interval
+        self.idle_ttl = idle_ttl
+        self.windows = {}
+        self.loads = SingleFlight()
+        self.upstream_calls = 0
+
+    async def _fetch(self, key):
+        self.upstream_calls += 1
+        articles = await self.fetch(*key)
+        entry = self.windows.get(key) or {"used_at": time.time()}
+        entry["articles"] = articles
+        entry["fetched_at"] = time.time()
+        self.windows[key] = entry
+        return articles
+
+    async def _load(self, key):
+        # Concurrent requests for the same window share a single upstream call
+        return await self.loads.do(key, lambda: self._fetch(key))
+
+    async def get_source(self, source_id, start_date, end_date):
+        key = (source_id, start_date, end_date)
+        entry = self.windows.get(key)
+        if entry is None:
+            return await self._load(key)
+        entry["used_at"] = time.time()
+        return entry["articles"]
+
+    async def get(self, source_ids, start_date, end_date):
+        # Articles from every requested source, in source order
+        results = await asyncio.gather(
+            *(self.get_source(source_id, start_date, end_date) for source_id in source_ids)
+        )
+        return [article for articles in results for article in articles]
+
+    async def refresh(self):
+        now = time.time()
+        for key, entry in list(self.windows.items()):
+            if now - entry["used_at"] > self.idle_ttl:
+                del self.windows[key]
+            elif now - entry["fetched_at"] >= self.refresh_interval:
+                try:
+                    await self._load(key)
+                except Exception:
+                    # Keep serving the previous articles until the next refresh succeeds
+                    traceback.print_exc()
+
+    async def refresh_forever(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval / 4)
+            await self.refresh()
+
+    def stats(self):
+        return {
+            "windows": len(self.windows),
+            "articles": sum(len(entry["articles"]) for entry in self.windows.values()),
+            "upstream_calls": self.upstream_calls,
+        }
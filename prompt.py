@@ -0,0 +1,100 @@
+import math
+from segments import topic_label
+
+
+def estimate_tokens(text):
+    return tokens_for_chars(len(text))
+
+
+def tokens_for_chars(chars):
+    # About four characters per token for English text with the OpenAI tokenizers
+    return math.ceil(chars / 4)
+
+
+def _clip(text, max_chars):
+    text = " ".join((text or "").split())
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars].rsplit(" ", 1)[0] + "…"
+
+
+class PromptEncoder:
+    """Writes grouped articles as a compact digest for the script writer.
+
+    Only what the writer uses is kept: date, source, title and a clipped
+    description, one line per article, under "== category ==" and "-- topic --"
+    headings. When the digest would exceed the token budget, articles are taken
+    round-robin across topics, newest first, so every topic keeps its lead
+    stories; an article that does not fit whole is kept as a headline only.
+    """
+
+    def __init__(self, tokens_per_word=6, min_tokens=2000, description_chars=300):
+        self.tokens_per_word = tokens_per_word
+        self.min_tokens = min_tokens
+        self.description_chars = description_chars
+
+    def budget(self, total_words):
+        return max(self.min_tokens, int(total_words * self.tokens_per_word))
+
+    def _line(self, art, with_description=True):
+        line = f"* {art.get('publishedAt', '')} | {art.get('source') or 'Unknown'} | {_clip(art.get('title'), 200)}"
+        description = _clip(art.get("description"), self.description_chars) if with_description else ""
+        return f"{line}: {description}" if description else line
+
+    def _select(self, ordered_grouped, budget):
+        # chosen[(category, keyword)][index] = line for each article that fits
+        buckets = [
+            ((category, keyword), list(enumerate(articles)))
+            for category, kwdict in ordered_grouped.items()
+            for keyword, articles in kwdict.items()
+        ]
+        chosen = {key: {} for key, _ in buckets}
+        seen = set()
+        while any(queue for _, queue in buckets):
+            for key, queue in buckets:
+                if not queue:
+                    continue
+                index, art = queue.pop()
+                # An article matching several keywords is described once, later mentions are headlines
+                identity = (art.get("source"), art.get("title"))
+                candidates = [self._line(art, identity not in seen), self._line(art, False)]
+                for line in candidates:
+                    cost = estimate_tokens(line) + 1
+                    if cost <= budget:
+                        budget -= cost
+                        chosen[key][index] = line
+                        seen.add(identity)
+                        break
+        return chosen
+
+    def encode(self, ordered_grouped, start_date, end_date, total_words):
+        """Return (prompt text, {"articles", "included", "tokens", "budget"})."""
+        header = (
+            f"News from {start_date} to {end_date}. Categories are in episode order, "
+            "topics within each category, articles oldest first.\n"
+            "Each article: * date | source | title: description\n"
+        )
+        budget = self.budget(total_words)
+        headings = sum(
+            estimate_tokens(f"== {c} ==") + sum(estimate_tokens(f"-- {topic_label(k)} --") for k in kw) + 2
+            for c, kw in ordered_grouped.items()
+        )
+        chosen = self._select(ordered_grouped, budget - estimate_tokens(header) - headings)
+
+        lines = [header]
+        for category, kwdict in ordered_grouped.items():
+            if not any(chosen[(category, keyword)] for keyword in kwdict):
+                continue
+            lines.append(f"== {category} ==")
+            for keyword in kwdict:
+                picked = chosen[(category, keyword)]
+                if picked:
+                    lines.append(f"-- {topic_label(keyword)} --")
+                    lines.extend(picked[i] for i in sorted(picked))
+        text = "\n".join(lines)
+        return text, {
+            "articles": sum(len(articles) for kwdict in ordered_grouped.values() for articles in kwdict.values()),
+            "included": sum(len(picked) for picked in chosen.values()),
+            "tokens": estimate_tokens(text),
+            "budget": budget,
+        }
@@ -0,0 +1,140 @@
+import asyncio
+import json
+import traceback
+from datetime import datetime, timezone
+from pathlib import Path
+
+
+def parse_hours(spec):
+    # "2-5" -> {2, 3, 4, 5}; "1,3" -> {1, 3}; ranges may wrap past midnight ("23-1")
+    hours = set()
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        if "-" in part:
+            start, end = (int(x) for x in part.split("-", 1))
+            hour = start
+            while True:
+                hours.add(hour % 24)
+                if hour % 24 == end % 24:
+                    break
+                hour += 1
+        else:
+            hours.add(int(part) % 24)
+    return hours
+
+
+class ConfigStats:
+    """Counts how often each request configuration is asked for, optionally persisted to a JSON file.
+
+    At most max_configs configurations are tracked; past that the least asked
+    for are dropped, so one-off requests cannot grow the counts without bound.
+    """
+
+    def __init__(self, path=None, decay=0.5, max_configs=None):
+        self.path = Path(path) if path else None
+        self.decay = decay
+        self.max_configs = max_configs
+        self.counts = {}
+        self.configs = {}
+        if self.path is not None and self.path.exists():
+            try:
+                saved = json.loads(self.path.read_text(encoding="utf-8"))
+                self.counts = saved.get("counts", {})
+                self.configs = saved.get("configs", {})
+            except ValueError:
+                traceback.print_exc()
+
+    def record(self, config):
+        key = json.dumps(config, sort_keys=True)
+        self.counts[key] = self.counts.get(key, 0) + 1
+        self.configs[key] = config
+        while self.max_configs is not None and len(self.counts) > self.max_configs:
+            # Drop the least asked for, never the configuration just recorded
+            drop = min((k for k in self.counts if k != key), key=self.counts.get)
+            del self.counts[drop]
+            del self.configs[drop]
+
+    def top(self, n):
+        ranked = sorted(self.counts.items(), key=lambda item: item[1], reverse=True)[:n]
+        return [(self.configs[key], count) for key, count in ranked]
+
+    def age(self):
+        # Older demand counts for less, so the warm set follows what users ask for lately
+        for key in list(self.counts):
+            self.counts[key] *= self.decay
+            if self.counts[key] < 0.1:
+                del self.counts[key]
+                del self.configs[key]
+
+    async def save(self):
+        if self.path is None:
+            return
+        # Serialize on the event loop (record() may run meanwhile), write the file off it
+        text = json.dumps({"counts": self.counts, "configs": self.configs})
+        await asyncio.to_thread(self._write, text)
+
+    def _write(self, text):
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(text, encoding="utf-8")
+        tmp_path.replace(self.path)
+
+
+class Warmer:
+    """Pre-builds the most requested configurations once a day during off-peak hours.
+
+    warm(config) runs the normal pipeline for one configuration so that its
+    fetch, script and audio results are already cached when users ask for them.
+    """
+
+    def __init__(self, stats, warm, hours, top_n=20, concurrency=1, check_interval=300):
+        self.stats = stats
+        self.warm = warm
+        self.hours = hours
+        self.top_n = top_n
+        self.concurrency = concurrency
+        self.check_interval = check_interval
+        self.last_run_date = None
+        self.last_run = None
+
+    async def run_once(self):
+        configs = [config for config, _ in self.stats.top(self.top_n)]
+        slots = asyncio.Semaphore(self.concurrency)
+        started = datetime.now(timezone.utc)
+        failures = 0
+
+        async def warm_one(config):
+            nonlocal failures
+            async with slots:
+                try:
+                    await self.warm(config)
+                except Exception:
+                    failures += 1
+                    traceback.print_exc()
+
+        await asyncio.gather(*(warm_one(config) for config in configs))
+        self.stats.age()
+        await self.stats.save()
+        self.last_run = {
+            "started_at": started.isoformat(),
+            "seconds": round((datetime.now(timezone.utc) - started).total_seconds(), 1),
+            "configs": len(configs),
+            "failures": failures,
+        }
+        print("Cache warming finished:", self.last_run)
+
+    async def run_forever(self):
+        while True:
+            now = datetime.now(timezone.utc)
+            if now.hour in self.hours and self.last_run_date != now.date():
+                self.last_run_date = now.date()
+                await self.run_once()
+            else:
+                await self.stats.save()
+            await asyncio.sleep(self.check_interval)
+
+    def stats_dict(self):
+        return {
+            "hours": sorted(self.hours),
+            "tracked_configs": len(self.stats.counts),
+            "top": [{"config": config, "count": round(count, 2)} for config, count in self.stats.top(5)],
+            "last_run": self.last_run,
+        }
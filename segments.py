@@ -0,0 +1,188 @@
+import asyncio
+import json
+from cache import cache_key
+from governor import Lane
+from tts import concat_mp3
+
+# Display labels for the catch-all keyword buckets
+BUCKET_LABELS = {"__UNMATCHED__": "other stories", "__NO_KEYWORDS__": "top stories"}
+
+SEGMENT_INSTRUCTIONS = """
+You are an award-winning podcast writer. Write one segment of a daily news podcast covering the {category} news about {topic}, using only the JSON articles provided (in chronological order). Write about {words} words.
+• Start directly with the first story: no greeting, no introduction of the show, no sign-off; other parts of the episode are written separately.
+• Cover the articles in the order they appear, citing sources and dates naturally, without inventing events or quotes.
+• Do not use headings, lists, bullet points, links, or any markdown.
+Output only the raw segment text.
+"""
+
+GLUE_INSTRUCTIONS = """
+You are the host of a daily news podcast. The episode is assembled from pre-written segments, listed in order in the JSON input with their category, topic and headlines, covering news from {start_date} to {end_date}.
+Write the connecting pieces in a natural spoken style, without markdown:
+• "intro": a concise, attention-grabbing hook (2-3 sentences) previewing the top stories and time frame.
+• "transitions": exactly {transitions} short sentences, one to lead into each segment after the first, in order.
+• "outro": a brief sign-off with a teaser for tomorrow's episode.
+Return a JSON object with exactly the keys "intro", "transitions" and "outro".
+"""
+
+
+def topic_label(keyword):
+    return BUCKET_LABELS.get(keyword, keyword)
+
+
+def articles_fingerprint(articles):
+    return cache_key([(a.get("source"), a.get("title"), a.get("publishedAt")) for a in articles])
+
+
+class SegmentComposer:
+    """Builds episodes from per-(category, keyword, window) segments that are scripted and voiced once.
+
+    Segment scripts are kept in script_cache and segment audio in the artifact
+    store, so a personalized episode only pays for its intro, transitions and outro.
+    synthesize(text, voice, speed) must return MP3 bytes. Script calls go through lane.
+    """
+
+    def __init__(self, client, script_cache, store, flights, synthesize, words_per_article=80, max_segment_words=400,
+                 lane=None):
+        self.client = client
+        self.lane = lane or Lane("llm")
+        self.script_cache = script_cache
+        self.store = store
+        self.flights = flights
+        self.synthesize = synthesize
+        self.words_per_article = words_per_article
+        self.max_segment_words = max_segment_words
+
+    def segment_words(self, articles):
+        return max(60, min(self.max_segment_words, self.words_per_article * len(articles)))
+
+    def plan(self, ordered_grouped, start_date, end_date, total_words):
+        # Segments in episode order, dropping trailing ones once the word budget is spent
+        budget = total_words - 80
+        segments = []
+        for category, kwdict in ordered_grouped.items():
+            for keyword, articles in kwdict.items():
+                words = self.segment_words(articles)
+                if segments and budget - words - 20 < 0:
+                    return segments
+                budget -= words + 20
+                segments.append({
+                    "category": category,
+                    "keyword": keyword,
+                    "articles": articles,
+                    "words": words,
+                    "key": cache_key("segment", category, keyword, start_date, end_date, articles_fingerprint(articles), words),
+                })
+        return segments
+
+    async def _write(self, instructions, payload, **kwargs):
+        response = await self.lane.run(lambda: self.client.responses.create(
+            model="gpt-4o-mini",
+            instructions=instructions,
+            input=json.dumps(payload, ensure_ascii=False),
+            **kwargs
+        ))
+        return response.output_text
+
+    async def segment_script(self, segment):
+        cached = await asyncio.to_thread(self.script_cache.get, segment["key"])
+        if cached is not None:
+            return cached["script"]
+
+        async def write():
+            script = await self._write(
+                SEGMENT_INSTRUCTIONS.format(
+                    category=segment["category"], topic=topic_label(segment["keyword"]), words=segment["words"]
+                ),
+                [{k: a.get(k) for k in ("source", "title", "description", "publishedAt")} for a in segment["articles"]],
+            )
+            await asyncio.to_thread(self.script_cache.set, segment["key"], {"script": script})
+            return script
+
+        return await self.flights.do(segment["key"], write)
+
+    async def segment_audio(self, script, voice, speed):
+        # Keyed by the script text: a segment whose script was rewritten gets new audio
+        audio_key = "segment-" + cache_key(script, voice, speed)
+        cached_path = self.store.find(audio_key, "audio")
+        if cached_path is not None:
+            return await asyncio.to_thread(cached_path.read_bytes)
+
+        async def voice_segment():
+            audio = await self.synthesize(script, voice, speed)
+            await asyncio.to_thread(self._save, audio_key, audio)
+            return audio
+
+        return await self.flights.do(audio_key, voice_segment)
+
+    def _save(self, audio_key, audio):
+        self.store.create(audio_key)
+        try:
+            self.store.path(audio_key, "audio").write_bytes(audio)
+        finally:
+            self.store.release(audio_key)
+
+    async def glue(self, segments, start_date, end_date):
+        payload = [
+            {
+                "category": s["category"],
+                "topic": topic_label(s["keyword"]),
+                "headlines": [a.get("title") for a in s["articles"][:3]],
+            }
+            for s in segments
+        ]
+        text = await self._write(
+            GLUE_INSTRUCTIONS.format(start_date=start_date, end_date=end_date, transitions=len(segments) - 1),
+            payload,
+            text={"format": {"type": "json_object"}},
+        )
+        try:
+            pieces = json.loads(text)
+        except ValueError:
+            pieces = None
+        if not isinstance(pieces, dict):
+            # The segments still make an episode without the connecting pieces
+            print("Glue output is not a JSON object, composing without intro, transitions and outro")
+            pieces = {}
+        transitions = pieces.get("transitions")
+        transitions = [str(t) for t in transitions] if isinstance(transitions, list) else []
+        transitions = (transitions + [""] * len(segments))[:len(segments) - 1]
+        return str(pieces.get("intro", "")), transitions, str(pieces.get("outro", ""))
+
+    async def _voiced(self, text, voice, speed):
+        return await self.synthesize(text, voice, speed) if text.strip() else b""
+
+    async def compose(self, ordered_grouped, start_date, end_date, total_words, voice, speed):
+        """Return (script, mp3 bytes, segment keys) for an episode assembled from cached segments.
+
+        Raises ValueError when ordered_grouped has nothing to build segments from;
+        check plan() first to write such an episode some other way.
+        """
+        segments = self.plan(ordered_grouped, start_date, end_date, total_words)
+        if not segments:
+            raise ValueError("No articles to build segments from")
+
+        async def build(segment):
+            script = await self.segment_script(segment)
+            return script, await self.segment_audio(script, voice, speed)
+
+        built, (intro, transitions, outro) = await asyncio.gather(
+            asyncio.gather(*(build(s) for s in segments)),
+            self.glue(segments, start_date, end_date),
+        )
+        glue_audio = await asyncio.gather(
+            *(self._voiced(text, voice, speed) for text in [intro, *transitions, outro])
+        )
+
+        texts = [intro]
+        parts = [glue_audio[0]]
+        for i, (script, audio) in enumerate(built):
+            if i > 0:
+                texts.append(transitions[i - 1])
+                parts.append(glue_audio[i])
+            texts.append(script)
+            parts.append(audio)
+        texts.append(outro)
+        parts.append(glue_audio[-1])
+
+        script = "\n\n".join(t.strip() for t in texts if t.strip())
+        return script, concat_mp3(p for p in parts if p), [s["key"] for s in segments]
@@ -0,0 +1,66 @@
+import asyncio
+from streams import Broadcast
+
+
+class Flight:
+    def __init__(self, key):
+        self.key = key
+        # Producers that stream (script deltas, audio parts) publish here for every waiter
+        self.stream = Broadcast()
+        self.task = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one in-flight task.
+
+    The task keeps running while anyone is waiting on it; once the last waiter
+    gives up (cancelled or timed out) the task is cancelled too.
+    """
+
+    def __init__(self):
+        self.flights = {}
+        self.started = 0
+        self.coalesced = 0
+
+    def join(self, key, fn):
+        # fn(flight) is started for the first caller; later callers share its flight
+        flight = self.flights.get(key)
+        if flight is not None:
+            self.coalesced += 1
+            return flight
+        flight = Flight(key)
+        flight.task = asyncio.create_task(fn(flight))
+        flight.task.add_done_callback(lambda _: self._forget(flight))
+        self.flights[key] = flight
+        self.started += 1
+        return flight
+
+    def _forget(self, flight):
+        if self.flights.get(flight.key) is flight:
+            del self.flights[flight.key]
+        if not flight.stream.closed:
+            if flight.task.cancelled():
+                flight.stream.close(RuntimeError("Cancelled"))
+            else:
+                flight.stream.close(flight.task.exception())
+
+    async def wait(self, flight):
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Forget it now: the task may take a few loop ticks to unwind, and callers
+                # arriving meanwhile must start a fresh flight rather than share a cancelled one
+                if self.flights.get(flight.key) is flight:
+                    del self.flights[flight.key]
+                flight.task.cancel()
+
+    async def do(self, key, fn):
+        # Shortcut for non-streaming calls: fn() is a coroutine function
+        return await self.wait(self.join(key, lambda flight: fn()))
+
+    def stats(self):
+        return {"in_flight": len(self.flights), "started": self.started, "coalesced": self.coalesced}
@@ -0,0 +1,80 @@
+from types import MappingProxyType
+
+
+class SourceRegistry:
+    """Read-only source catalogue, built once at startup.
+
+    categories maps each category to its NewsAPI source ids; the categories in
+    user_categories (General and Politics) are filled per request instead, see
+    select(). A source id or display name belongs to the last category listing
+    it, so lookups agree with walking the categories in order.
+    """
+
+    def __init__(self, categories, display_names, input_aliases, user_categories=("General", "Politics")):
+        self.categories = MappingProxyType({c: tuple(ids) for c, ids in categories.items()})
+        self.display_names = MappingProxyType(dict(display_names))
+        self.input_aliases = MappingProxyType(dict(input_aliases))
+        self.user_categories = frozenset(user_categories)
+        self.position = MappingProxyType({c: i for i, c in enumerate(self.categories)})
+        # id or display name -> (category position, category) for the fixed categories
+        self.fixed = MappingProxyType(self._index(
+            (c, ids) for c, ids in self.categories.items() if c not in self.user_categories
+        ))
+
+    def _index(self, categories):
+        index = {}
+        for category, ids in categories:
+            entry = (self.position[category], category)
+            for source_id in ids:
+                for key in (source_id, self.display_name(source_id)):
+                    if key not in index or index[key][0] <= entry[0]:
+                        index[key] = entry
+        return index
+
+    def display_name(self, source_id):
+        return self.display_names.get(source_id, source_id)
+
+    def resolve(self, name):
+        # Source id for a name picked in the app ("Fox News" -> "fox-news")
+        return self.input_aliases.get(name, name.lower().replace(" ", "-"))
+
+    def select(self, user_sources):
+        """Per-request view with the user's choices, {category: [names]}, for the user categories."""
+        return SourceSelection(self, {
+            category: tuple(self.resolve(name) for name in names)
+            for category, names in user_sources.items()
+            if category in self.user_categories
+        })
+
+
+class SourceSelection:
+    """The registry plus one request's General/Politics sources; shares nothing mutable."""
+
+    def __init__(self, registry, user_categories):
+        self.registry = registry
+        self.user_categories = user_categories
+        self.overlay = registry._index(
+            sorted(user_categories.items(), key=lambda item: registry.position[item[0]])
+        )
+
+    def sources(self, category):
+        if category in self.user_categories:
+            return self.user_categories[category]
+        if category in self.registry.user_categories:
+            return ()
+        return self.registry.categories[category]
+
+    def sources_for(self, chosen_categories):
+        # Source ids of the chosen categories, in order, without repeats
+        return list(dict.fromkeys(s for category in chosen_categories for s in self.sources(category)))
+
+    def category_of(self, key):
+        entries = [e for e in (self.overlay.get(key), self.registry.fixed.get(key)) if e is not None]
+        return max(entries)[1] if entries else None
+
+    def category_for(self, source_id, source_name):
+        # Category of an article by its source id, else its source name
+        category = self.category_of(source_id)
+        if category is None:
+            category = self.category_of(source_name)
+        return category or "Unknown"
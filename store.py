@@ -0,0 +1,256 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta, timezone
+from dedup import normalize_title
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    url TEXT PRIMARY KEY,
+    source_id TEXT NOT NULL,
+    published_at TEXT NOT NULL,
+    published_date TEXT NOT NULL,
+    norm_title TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    ingested_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS articles_source_date ON articles (source_id, published_date);
+CREATE INDEX IF NOT EXISTS articles_date ON articles (published_date);
+CREATE INDEX IF NOT EXISTS articles_norm_title ON articles (norm_title);
+CREATE TABLE IF NOT EXISTS coverage (
+    source_id TEXT PRIMARY KEY,
+    covered_from TEXT NOT NULL,
+    covered_to TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+);
+"""
+
+# Upper bound for "everything up to now", e.g. for refreshes
+OPEN_END = "9999-12-31T23:59:59"
+TIME_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+def _now():
+    return datetime.now(timezone.utc).strftime(TIME_FORMAT)
+
+
+def _parse(stamp):
+    # Dates, and timestamps with or without a trailing Z, as naive UTC
+    return datetime.fromisoformat(stamp.rstrip("Z"))
+
+
+# Newest copy of each normalized title within the window, sources in the order asked for
+WINDOW_QUERY = """
+WITH chosen(source_id, rank) AS (VALUES {values}),
+ranked AS (
+    SELECT a.payload, c.rank, a.published_at,
+           ROW_NUMBER() OVER (PARTITION BY a.norm_title ORDER BY c.rank, a.published_at DESC) AS copy
+    FROM articles a JOIN chosen c ON a.source_id = c.source_id
+    WHERE a.published_date BETWEEN ? AND ?
+)
+SELECT payload FROM ranked WHERE copy = 1 ORDER BY rank, published_at DESC
+"""
+
+
+class ArticleStore:
+    """SQLite article store that NewsAPI results are ingested into incrementally.
+
+    fetch(source_id, since, until) returns (articles, total) for one source
+    published between two dates or timestamps, newest first. Per source the store
+    keeps the range it holds every article of, [covered_from, covered_to]. A
+    window is only fetched where it reaches outside that range: older parts are
+    backfilled, newer ones fetched up to the window end (or now, at most every
+    refresh_interval seconds). When the page cap cuts a backfill short, fetching
+    continues below the oldest article received. Newer articles are fetched in
+    sub-windows starting at covered_to, halved whenever the cap cuts one short,
+    so the range moves up by every sub-window received in full. Either way a
+    call makes at most max_rounds fetches, and the range only ever grows over
+    what was actually received. Background refreshes stop at the newest window
+    end requested for the source. Windows are then read with an indexed query
+    that also drops exact title repeats.
+    """
+
+    def __init__(self, path, fetch, refresh_interval=600, idle_ttl=3600, retention_days=45, max_rounds=10):
+        self.path = path
+        self.fetch = fetch
+        self.refresh_interval = refresh_interval
+        self.idle_ttl = idle_ttl
+        self.retention_days = retention_days
+        self.max_rounds = max_rounds
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._source_locks = {}
+        self.used_at = {}
+        # Newest window end requested per source; refreshes do not fetch past it
+        self.requested_until = {}
+        self.upstream_calls = 0
+        self.truncated = 0
+
+    def _coverage(self, source_id):
+        with self._lock:
+            return self.db.execute(
+                "SELECT covered_from, covered_to, fetched_at FROM coverage WHERE source_id = ?", (source_id,)
+            ).fetchone()
+
+    def _ingest(self, source_id, articles, covered_from, covered_to, fetched_at):
+        rows = []
+        for a in articles:
+            published_at = a.get("publishedAt") or ""
+            if not a.get("url") or not published_at:
+                continue
+            rows.append((
+                a["url"], source_id, published_at, published_at[:10],
+                normalize_title(a.get("title")), json.dumps(a, ensure_ascii=False), time.time(),
+            ))
+        with self._lock, self.db:
+            self.db.executemany("INSERT OR REPLACE INTO articles VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self.db.execute(
+                """
+                INSERT INTO coverage VALUES (?, ?, ?, ?)
+                ON CONFLICT (source_id) DO UPDATE SET
+                    covered_from = min(covered_from, excluded.covered_from),
+                    covered_to = max(covered_to, excluded.covered_to),
+                    fetched_at = max(fetched_at, excluded.fetched_at)
+                """,
+                (source_id, covered_from, covered_to, fetched_at),
+            )
+        return len(rows)
+
+    async def _fetch_range(self, source_id, since, until):
+        """Fetch [since, until], returning (articles, lowest bound fully fetched)."""
+        received = []
+        upper = until
+        for _ in range(self.max_rounds):
+            self.upstream_calls += 1
+            articles, total = await self.fetch(source_id, since, upper)
+            received.extend(articles)
+            if total <= len(articles) or not articles:
+                return received, since
+            # The page cap cut this fetch short: everything from its oldest article up is in hand
+            self.truncated += 1
+            oldest = min((a["publishedAt"] for a in articles if a.get("publishedAt")), default=upper)
+            if oldest >= upper:
+                break
+            upper = oldest
+        print(f"Article store: {source_id} is only complete from {upper} to {until}")
+        return received, upper
+
+    async def _update(self, source_id, since, until):
+        now = _now()
+        target = min(until, now)
+        state = await asyncio.to_thread(self._coverage, source_id)
+        if state is None:
+            articles, lower = await self._fetch_range(source_id, since, target)
+            await asyncio.to_thread(self._ingest, source_id, articles, lower, target, time.time())
+            return
+        covered_from, covered_to, fetched_at = state
+        if since < covered_from:
+            # Backfill below the range; whatever the cap left out is tried again next time
+            articles, lower = await self._fetch_range(source_id, since, covered_from)
+            await asyncio.to_thread(self._ingest, source_id, articles, lower, covered_to, fetched_at)
+        if covered_to >= target or (target == now and time.time() - fetched_at < self.refresh_interval):
+            return
+        await self._extend(source_id, covered_from, covered_to, target)
+
+    async def _extend(self, source_id, covered_from, covered_to, target):
+        # Newer articles, upward from the top of the range in sub-windows that fit in one fetch
+        lower, end = _parse(covered_to), _parse(target)
+        span = end - lower
+        for _ in range(self.max_rounds):
+            if lower >= end:
+                return
+            upper = min(end, lower + span)
+            fetched_at = time.time()
+            self.upstream_calls += 1
+            articles, total = await self.fetch(source_id, lower.strftime(TIME_FORMAT), upper.strftime(TIME_FORMAT))
+            complete = total <= len(articles) or not articles
+            if complete:
+                covered_to = upper.strftime(TIME_FORMAT)
+            await asyncio.to_thread(self._ingest, source_id, articles, covered_from, covered_to, fetched_at)
+            if complete:
+                lower = upper
+                continue
+            # The page cap cut this sub-window short: the next one starts at the same point, narrower
+            self.truncated += 1
+            oldest = min((a["publishedAt"] for a in articles if a.get("publishedAt")), default=None)
+            received = upper - _parse(oldest) if oldest else span
+            span = max(timedelta(seconds=1), min(span / 2, received))
+        if lower < end:
+            print(f"Article store: {source_id} is only complete up to {covered_to}, {target} is left for later")
+
+    async def update_source(self, source_id, since, until=OPEN_END):
+        # One ingestion per source at a time; waiters see its result instead of fetching again
+        lock = self._source_locks.setdefault(source_id, asyncio.Lock())
+        async with lock:
+            await self._update(source_id, since, until)
+
+    def _read(self, source_ids, start_date, end_date):
+        values = ", ".join("(?, ?)" for _ in source_ids)
+        params = [p for i, source_id in enumerate(source_ids) for p in (source_id, i)]
+        with self._lock:
+            rows = self.db.execute(WINDOW_QUERY.format(values=values), params + [start_date, end_date]).fetchall()
+        return [json.loads(payload) for (payload,) in rows]
+
+    async def get(self, source_ids, start_date, end_date):
+        # Articles from the requested sources published within the window, in source order
+        if not source_ids:
+            return []
+        now = time.time()
+        until = f"{end_date}T23:59:59"
+        for source_id in source_ids:
+            self.used_at[source_id] = now
+            self.requested_until[source_id] = max(self.requested_until.get(source_id, until), until)
+        results = await asyncio.gather(
+            *(self.update_source(source_id, start_date, until) for source_id in source_ids),
+            return_exceptions=True,
+        )
+        for source_id, result in zip(source_ids, results):
+            if isinstance(result, BaseException):
+                # Serve what is already stored; the next request or refresh tries again
+                print(f"Article store: updating {source_id} failed: {result!r}")
+        return await asyncio.to_thread(self._read, list(source_ids), start_date, end_date)
+
+    def _prune(self):
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=self.retention_days)).strftime("%Y-%m-%d")
+        with self._lock, self.db:
+            self.db.execute("DELETE FROM articles WHERE published_date < ?", (cutoff,))
+            self.db.execute("UPDATE coverage SET covered_from = ? WHERE covered_from < ?", (cutoff, cutoff))
+
+    async def refresh(self):
+        now = time.time()
+        for source_id, used_at in list(self.used_at.items()):
+            if now - used_at > self.idle_ttl:
+                del self.used_at[source_id]
+                self.requested_until.pop(source_id, None)
+                continue
+            try:
+                state = await asyncio.to_thread(self._coverage, source_id)
+                if state is not None:
+                    await self.update_source(source_id, state[0], self.requested_until.get(source_id, OPEN_END))
+            except Exception:
+                traceback.print_exc()
+        await asyncio.to_thread(self._prune)
+
+    async def refresh_forever(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval / 4)
+            await self.refresh()
+
+    def _counts(self):
+        with self._lock:
+            return self.db.execute("SELECT (SELECT count(*) FROM articles), (SELECT count(*) FROM coverage)").fetchone()
+
+    def stats(self):
+        articles, sources = self._counts()
+        return {
+            "path": str(self.path),
+            "articles": articles,
+            "sources": sources,
+            "upstream_calls": self.upstream_calls,
+            "truncated_fetches": self.truncated,
+        }
@@ -0,0 +1,59 @@
+import asyncio
+
+
+class Broadcast:
+    """Append-only sequence that any number of readers can follow while it grows.
+
+    Every reader starts from the first item, so late subscribers still get
+    everything published so far before waiting for new items.
+    """
+
+    def __init__(self):
+        self.items = []
+        self.closed = False
+        self.error = None
+        self._changed = asyncio.Event()
+
+    def publish(self, item):
+        self.items.append(item)
+        self._notify()
+
+    def close(self, error=None):
+        self.closed = True
+        self.error = error
+        self._notify()
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def subscribe(self):
+        position = 0
+        while True:
+            while position < len(self.items):
+                yield self.items[position]
+                position += 1
+            if self.closed:
+                if self.error is not None:
+                    raise self.error
+                return
+            await self._changed.wait()
+
+
+def completed_stream(item):
+    # A stream that already holds its only item, for results that come from a cache
+    stream = Broadcast()
+    stream.publish(item)
+    stream.close()
+    return stream
+
+
+async def relay(source, target):
+    # Copies everything published on source to target, including how it ends
+    try:
+        async for item in source.subscribe():
+            target.publish(item)
+    except Exception as e:
+        target.close(e)
+        return
+    target.close()
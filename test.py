@@ -35,3 +35,17 @@ try:
     print("Parsed JSON:", data)
 except ValueError:
     print("No JSON could be decoded from the response.")
+
+# 3) Same request in job mode: submit, then poll until the episode is ready
+import time
+
+job = requests.post(f"{BASE_URL}/jobs", json = payload, timeout = 10).json()
+print("POST /jobs →", job)
+while job.get("status") not in ("completed", "failed", "cancelled"):
+    time.sleep(2)
+    job = requests.get(f"{BASE_URL}/jobs/{job['job_id']}", timeout = 10).json()
+    print("Job status:", job.get("status"), job.get("stage"), job.get("progress"))
+
+if job.get("status") == "completed":
+    title = requests.get(f"{BASE_URL}/jobs/{job['job_id']}/title", timeout = 10)
+    print("Episode title:", title.text)
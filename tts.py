@@ -0,0 +1,206 @@
+import asyncio
+import re
+
+# Layer III bitrates (kbps) and sample rates (Hz), indexed by the header fields
+_BITRATES = {
+    1: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 0],
+    2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160, 0],
+}
+_SAMPLE_RATES = {
+    3: [44100, 48000, 32000],  # MPEG-1
+    2: [22050, 24000, 16000],  # MPEG-2
+    0: [11025, 12000, 8000],   # MPEG-2.5
+}
+
+_paragraph_split = re.compile(r"\n\s*\n")
+_sentence_split = re.compile(r"(?<=[.!?…])\s+|(?<=[.!?…][\"'”’)])\s+")
+
+
+def _pack(pieces, max_chars, sep):
+    # Greedily join pieces with sep while staying under max_chars
+    chunks = []
+    current = ""
+    for piece in pieces:
+        candidate = f"{current}{sep}{piece}" if current else piece
+        if len(candidate) <= max_chars:
+            current = candidate
+            continue
+        if current:
+            chunks.append(current)
+        current = piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _split_long(text, max_chars):
+    if len(text) <= max_chars:
+        return [text]
+    pieces = []
+    for sentence in _sentence_split.split(text):
+        if len(sentence) <= max_chars:
+            pieces.append(sentence)
+            continue
+        # A single run-on sentence: fall back to word boundaries
+        pieces.extend(_pack(sentence.split(), max_chars, " "))
+    return _pack(pieces, max_chars, " ")
+
+
+def _strip_id3(data):
+    # ID3v2 tag at the start (synchsafe size, optional footer)
+    if data[:3] == b"ID3" and len(data) >= 10:
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        footer = 10 if data[5] & 0x10 else 0
+        data = data[10 + size + footer:]
+    # ID3v1 tag at the end
+    if len(data) >= 128 and data[-128:-125] == b"TAG":
+        data = data[:-128]
+    return data
+
+
+def _frame_info(data, offset=0):
+    # Returns (frame_length, side_info_length) for the MP3 frame at offset, or None
+    if len(data) < offset + 4:
+        return None
+    b1, b2, b3 = data[offset + 1], data[offset + 2], data[offset + 3]
+    if data[offset] != 0xFF or (b1 & 0xE0) != 0xE0:
+        return None
+    version = (b1 >> 3) & 0x03
+    layer = (b1 >> 1) & 0x03
+    bitrate_index = (b2 >> 4) & 0x0F
+    rate_index = (b2 >> 2) & 0x03
+    if version == 1 or layer != 1 or rate_index == 3:
+        return None
+    bitrate = _BITRATES[1 if version == 3 else 2][bitrate_index] * 1000
+    if not bitrate:
+        return None
+    sample_rate = _SAMPLE_RATES[version][rate_index]
+    padding = (b2 >> 1) & 0x01
+    mono = (b3 >> 6) & 0x03 == 3
+    if version == 3:
+        length = 144 * bitrate // sample_rate + padding
+        side_info = 17 if mono else 32
+    else:
+        length = 72 * bitrate // sample_rate + padding
+        side_info = 9 if mono else 17
+    return length, side_info
+
+
+def _strip_vbr_header(data):
+    # A leading Xing/Info/VBRI frame describes only its own file, so drop it
+    info = _frame_info(data)
+    if info is None:
+        return data
+    length, side_info = info
+    xing_at = 4 + side_info
+    if data[xing_at:xing_at + 4] in (b"Xing", b"Info") or data[36:40] == b"VBRI":
+        return data[length:]
+    return data
+
+
+def clean_part(data):
+    # Strip everything but the audio frames so parts can be joined back to back
+    return _strip_vbr_header(_strip_id3(data))
+
+
+def concat_mp3(parts):
+    """Join MP3 files frame-to-frame without re-encoding."""
+    return b"".join(clean_part(part) for part in parts)
+
+
+async def synthesize_chunk(client, text, voice, speed, lane):
+    # The lane retries only this chunk when the upstream call fails
+    async def speak():
+        async with client.audio.speech.with_streaming_response.create(
+            model="gpt-4o-mini-tts",
+            voice=voice,
+            input=text,
+            instructions="Read the script of a podcast.",
+            speed=speed,
+            response_format="mp3",
+        ) as audio_response:
+            return await audio_response.read()
+
+    return await lane.run(speak)
+
+
+async def _chunks_from(paragraphs, max_chars):
+    # TTS-sized chunks at paragraph, then sentence, boundaries, packed as paragraphs arrive
+    current = ""
+    async for paragraph in paragraphs:
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        for piece in _split_long(paragraph, max_chars):
+            candidate = f"{current}\n\n{piece}" if current else piece
+            if len(candidate) <= max_chars:
+                current = candidate
+                continue
+            if current:
+                yield current
+            current = piece
+    if current:
+        yield current
+
+
+async def split_paragraphs(deltas):
+    """Turn a stream of text deltas into a stream of completed paragraphs."""
+    buffer = ""
+    async for delta in deltas:
+        buffer += delta
+        *done, buffer = _paragraph_split.split(buffer)
+        for paragraph in done:
+            yield paragraph
+    yield buffer
+
+
+async def _iterate(items):
+    for item in items:
+        yield item
+
+
+async def synthesize_stream(client, paragraphs, voice, speed, lane, max_chars=1500, concurrency=4, on_part=None):
+    """Synthesize paragraphs from an async stream and return the joined MP3 bytes.
+
+    Chunks are dispatched as soon as enough paragraphs have arrived, so audio
+    synthesis overlaps with script generation. If given, on_part is awaited with
+    each cleaned chunk in script order as soon as it and every chunk before it
+    are done, so callers can stream the audio. concurrency caps this episode's
+    chunks; lane is shared by every episode and retries failed chunks.
+    """
+    slots = asyncio.Semaphore(concurrency)
+    deliver = asyncio.Lock()
+    parts = []
+    tasks = []
+    delivered = 0
+
+    async def run(index, text):
+        nonlocal delivered
+        async with slots:
+            data = await synthesize_chunk(client, text, voice, speed, lane)
+        parts[index] = clean_part(data)
+        if on_part is None:
+            return
+        async with deliver:
+            while delivered < len(parts) and parts[delivered] is not None:
+                await on_part(parts[delivered])
+                delivered += 1
+
+    try:
+        async for text in _chunks_from(paragraphs, max_chars):
+            parts.append(None)
+            tasks.append(asyncio.create_task(run(len(tasks), text)))
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+    return b"".join(parts)
+
+
+async def synthesize(client, script, voice, speed, lane, max_chars=1500, concurrency=4, on_part=None):
+    """Synthesize a complete script in concurrent chunks and return the joined MP3 bytes."""
+    paragraphs = _paragraph_split.split(script.strip()) or [script]
+    return await synthesize_stream(
+        client, _iterate(paragraphs), voice, speed, lane, max_chars, concurrency, on_part
+    )